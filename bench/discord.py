@@ -0,0 +1,244 @@
+"""
+Local stand-in for the parts of the Discord REST API that `HTTPService` uses.
+
+Routes are rate limited per bucket and major parameter the way Discord does it,
+including the `X-RateLimit-*` headers and 429 responses, so the hikari rate
+limiter behaves like it does in production.
+"""
+
+from __future__ import annotations
+
+import collections
+import json
+import re
+import time
+import typing
+from datetime import datetime, timezone
+
+from aiohttp import web
+
+# method, path pattern, bucket name, (limit, period in seconds)
+ROUTES: tuple[tuple[str, str, str, tuple[int, float]], ...] = (
+    ("POST", r"/channels/(\d+)/messages/bulk-delete", "bulk_delete", (1, 1.0)),
+    ("POST", r"/channels/(\d+)/messages", "create_message", (5, 5.0)),
+    ("DELETE", r"/channels/(\d+)/messages/(\d+)", "delete_message", (5, 1.0)),
+    ("PATCH", r"/channels/(\d+)", "edit_channel", (5, 5.0)),
+    ("PATCH", r"/guilds/(\d+)/members/(\d+)", "edit_member", (10, 10.0)),
+    ("DELETE", r"/guilds/(\d+)/members/(\d+)", "kick_user", (5, 1.0)),
+    ("PUT", r"/guilds/(\d+)/bans/(\d+)", "ban_user", (5, 1.0)),
+    ("PUT", r"/guilds/(\d+)/members/(\d+)/roles/(\d+)", "add_role", (10, 10.0)),
+    ("DELETE", r"/guilds/(\d+)/members/(\d+)/roles/(\d+)", "remove_role", (10, 10.0)),
+)
+GLOBAL_LIMIT = 50  # requests per second
+BOT_ID = 1000
+
+
+class Call(typing.NamedTuple):
+    timestamp: float
+    bucket: str
+    params: tuple[int, ...]
+    status: int
+    body: typing.Any
+
+
+class Bucket:
+    def __init__(self, limit: int, period: float) -> None:
+        self.limit = limit
+        self.period = period
+        self.remaining = limit
+        self.reset_at = 0.0
+
+    def acquire(self, now: float) -> bool:
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.period
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+
+class FakeDiscord:
+    calls: list[Call]
+    buckets: dict[tuple[str, int], Bucket]
+
+    def __init__(self) -> None:
+        self.calls = []
+        self.buckets = {}
+        self.global_window = 0.0
+        self.global_count = 0
+        self.rate_limited: collections.Counter[str] = collections.Counter()
+        self.routes = [
+            (method, re.compile(f"^/api/v\\d+{pattern}$"), name, limits)
+            for method, pattern, name, limits in ROUTES
+        ]
+        self.app = web.Application()
+        self.app.router.add_route("*", "/{path:.*}", self.handle)
+        self.runner: web.AppRunner | None = None
+        self.url = ""
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        sockets = site._server.sockets  # type: ignore
+        self.url = f"http://{host}:{sockets[0].getsockname()[1]}/api/v10"
+        return self.url
+
+    async def close(self) -> None:
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+    def match(
+        self, method: str, path: str
+    ) -> tuple[str, tuple[int, float], tuple[int, ...]] | None:
+        for route_method, pattern, name, limits in self.routes:
+            if route_method == method and (found := pattern.match(path)):
+                return name, limits, tuple(map(int, found.groups()))
+        return None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        now = time.monotonic()
+        matched = self.match(request.method, request.path)
+        if matched is None:
+            return web.json_response(
+                {"message": "404: Not Found", "code": 0}, status=404
+            )
+        name, (limit, period), params = matched
+
+        if now - self.global_window >= 1:
+            self.global_window, self.global_count = now, 0
+        self.global_count += 1
+        if self.global_count > GLOBAL_LIMIT:
+            return self.too_many_requests(name, self.global_window + 1 - now)
+
+        key = (name, params[0])  # rate limits are per major parameter
+        bucket = self.buckets.get(key, None)
+        if bucket is None:
+            bucket = self.buckets[key] = Bucket(limit, period)
+        if not bucket.acquire(now):
+            return self.too_many_requests(
+                name, bucket.reset_at - now, self.headers(name, params, bucket, now)
+            )
+
+        body = await request.json() if request.can_read_body else None
+        payload = self.respond(name, params, body)
+        status = 204 if payload is None else 200
+        self.calls.append(Call(now, name, params, status, body))
+
+        headers = self.headers(name, params, bucket, now)
+        if payload is None:
+            return web.Response(status=204, headers=headers)
+        return web.Response(
+            text=json.dumps(payload), content_type="application/json", headers=headers
+        )
+
+    def headers(
+        self, name: str, params: tuple[int, ...], bucket: Bucket, now: float
+    ) -> dict[str, str]:
+        reset_after = max(bucket.reset_at - now, 0)
+        return {
+            "X-RateLimit-Limit": str(bucket.limit),
+            "X-RateLimit-Remaining": str(bucket.remaining),
+            "X-RateLimit-Reset": f"{time.time() + reset_after:.3f}",
+            "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+            "X-RateLimit-Bucket": f"{name}:{params[0]}",
+        }
+
+    def too_many_requests(
+        self,
+        name: str,
+        retry_after: float,
+        bucket_headers: dict[str, str] | None = None,
+    ) -> web.Response:
+        """429 for the route bucket, or the global limit without `bucket_headers`."""
+        self.rate_limited[name] += 1
+        retry_after = max(retry_after, 0.001)
+        is_global = bucket_headers is None
+        headers = {
+            **(bucket_headers or {}),
+            "Retry-After": f"{retry_after:.3f}",
+            "X-RateLimit-Scope": "global" if is_global else "user",
+        }
+        if is_global:
+            headers["X-RateLimit-Global"] = "true"
+        return web.json_response(
+            {
+                "message": "You are being rate limited.",
+                "retry_after": retry_after,
+                "global": is_global,
+            },
+            status=429,
+            headers=headers,
+        )
+
+    def respond(
+        self, name: str, params: tuple[int, ...], body: typing.Any
+    ) -> typing.Any:
+        if name == "create_message":
+            return self.message_payload(params[0], (body or {}).get("content", ""))
+        elif name == "edit_member":
+            return self.member_payload(params[1], body or {})
+        elif name == "edit_channel":
+            return self.channel_payload(params[0], body or {})
+        return None
+
+    def user_payload(self, user_id: int) -> dict[str, typing.Any]:
+        return {
+            "id": str(user_id),
+            "username": f"user{user_id}",
+            "discriminator": "0001",
+            "avatar": None,
+        }
+
+    def message_payload(self, channel_id: int, content: str) -> dict[str, typing.Any]:
+        return {
+            "id": str(len(self.calls) + 1 << 22),
+            "channel_id": str(channel_id),
+            "author": {**self.user_payload(BOT_ID), "bot": True},
+            "content": content,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": [],
+            "reactions": [],
+            "pinned": False,
+            "type": 0,
+            "flags": 0,
+        }
+
+    def member_payload(
+        self, user_id: int, body: dict[str, typing.Any]
+    ) -> dict[str, typing.Any]:
+        return {
+            "user": self.user_payload(user_id),
+            "nick": body.get("nick", None),
+            "roles": [],
+            "joined_at": datetime.now(timezone.utc).isoformat(),
+            "deaf": False,
+            "mute": False,
+            "communication_disabled_until": body.get(
+                "communication_disabled_until", None
+            ),
+        }
+
+    def channel_payload(
+        self, channel_id: int, body: dict[str, typing.Any]
+    ) -> dict[str, typing.Any]:
+        return {
+            "id": str(channel_id),
+            "type": 0,
+            "guild_id": "1",
+            "name": "channel",
+            "position": 0,
+            "permission_overwrites": [],
+            "nsfw": False,
+            "topic": None,
+            "last_message_id": None,
+            "rate_limit_per_user": body.get("rate_limit_per_user", 0),
+        }
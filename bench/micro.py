@@ -0,0 +1,316 @@
+"""
+Microbenchmarks for the antispam mitigations and firewall rules.
+
+    python -m bench.micro
+    python -m bench.micro traffic.similar ping --save bench/baseline.json
+    python -m bench.micro --compare bench/baseline.json
+
+Mitigation detections run against message windows of 10 to 10,000 messages.
+Matches and firewall rules run against messages of growing length, plain and
+dense with mentions, URLs and escaped pings, and of growing density of each.
+Each series prints its scaling exponent between the two largest inputs, so a
+rule that turned quadratic shows up as `n^2.0` instead of `n^1.0`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import sys
+import timeit
+import typing
+from pathlib import Path
+
+import hikari
+
+from clend.guild.components.mitigations import mitigations
+from clend.guild.components.rules import firewall_rules
+from clend.guild.guild import CleanerGuild
+
+from . import streams, stubs
+
+WINDOWS = (10, 100, 1000, 10000)
+LENGTHS = (16, 256, 2000, 8000)
+DENSITIES = (0.0, 0.1, 0.3, 0.5)
+DENSITY_LENGTH = 2000
+# mix for the "dense" length series, where work per token starts to add up
+DENSE = {"mentions": 0.1, "urls": 0.1, "escaped": 0.1}
+# every measurement takes at least this long, the best of REPEAT is kept
+BUDGET = 0.02
+REPEAT = 3
+# axes that grow the input, the density axes have no meaningful exponent
+SIZE_AXES = ("window", "length", "dense")
+# exponents above this are flagged as superlinear
+SUPERLINEAR = 1.5
+# differences below this are noise, whatever the ratio
+NOISE_FLOOR = 1e-6
+
+
+class Series(typing.NamedTuple):
+    name: str
+    axis: str
+    points: list[tuple[float, float]]  # axis value, seconds per call
+
+    @property
+    def exponent(self) -> float | None:
+        if self.axis not in SIZE_AXES:
+            return None
+        # the small inputs are dominated by call overhead
+        (x0, t0), (x1, t1) = self.points[-2:]
+        if x1 <= x0 or t0 <= 0:
+            return None
+        return math.log(t1 / t0) / math.log(x1 / x0)
+
+    def format(self) -> str:
+        points = "  ".join(f"{x:g}:{t * 1e6:,.1f}µs" for x, t in self.points)
+        exponent = self.exponent
+        curve = "" if exponent is None else f"  n^{exponent:.2f}"
+        flag = " !" if exponent is not None and exponent >= SUPERLINEAR else ""
+        return f"{self.name:<40} {self.axis:<9} {points}{curve}{flag}"
+
+
+def measure(func: typing.Callable[[], typing.Any]) -> float:
+    """Seconds per call."""
+    timer = timeit.Timer(func)
+    number = 1
+    while (elapsed := timer.timeit(number)) < BUDGET:
+        number *= 2 if elapsed * 10 > BUDGET else 10
+    best = min([elapsed, *timer.repeat(REPEAT - 1, number)])
+    return best / number
+
+
+class Corpus:
+    """Messages for a single stub guild, seeded so runs are comparable."""
+
+    def __init__(self, seed: int = 1) -> None:
+        self.world = streams.World(seed)
+        self.random = self.world.random
+        self.stickers = [stubs.Sticker(749054660769218631 + i) for i in range(8)]
+        self.guild = CleanerGuild(
+            self.world.guild.id, stubs.App(stubs.guild_data())  # type: ignore
+        )
+        self.guild.settings_loaded = True
+
+    def content(
+        self,
+        length: int,
+        mentions: float = 0.0,
+        urls: float = 0.0,
+        escaped: float = 0.0,
+    ) -> tuple[str, list[int]]:
+        """Text of about `length` characters and the ids it mentions."""
+        parts: list[str] = []
+        mentioned: list[int] = []
+        size = 0
+        while size < length:
+            roll = self.random.random()
+            if roll < mentions:
+                member = self.random.choice(self.world.members)
+                mentioned.append(member.id)
+                part = f"<@{member.id}>"
+            elif roll < mentions + urls:
+                domain = self.random.choice(streams.PHISHING_DOMAINS)
+                part = f"https://{domain}/{self.random.randrange(10**6)}"
+            elif roll < mentions + urls + escaped:
+                part = "`@everyone`"
+            else:
+                part = self.random.choice(streams.WORDS)
+            parts.append(part)
+            size += len(part) + 1
+        return " ".join(parts)[:length], mentioned
+
+    def message(
+        self,
+        length: int = 64,
+        member: stubs.Member | None = None,
+        channel: stubs.Channel | None = None,
+        density: dict[str, float] | None = None,
+    ) -> stubs.Message:
+        text, mentioned = self.content(length, **(density or {}))
+        roll = self.random.random()
+        extra: dict[str, typing.Any] = {}
+        if roll < 0.1:
+            extra["stickers"] = (self.random.choice(self.stickers),)
+        elif roll < 0.2:
+            size = self.random.randrange(1000, 1010)
+            extra["attachments"] = (stubs.Attachment("image.png", size),)
+        return stubs.Message(
+            channel or self.random.choice(self.world.channels),
+            member or self.random.choice(self.world.members),
+            text,
+            user_mentions=mentioned,
+            **extra,
+        )
+
+    def window(self, size: int) -> list[stubs.Message]:
+        return [self.message(self.random.choice((16, 64, 256))) for _ in range(size)]
+
+    def raid(self, message: stubs.Message, size: int = 50) -> list[stubs.Message]:
+        """Copies of `message` from other members, enough to trigger detection."""
+        copies = []
+        for _ in range(size):
+            copy = stubs.Message(
+                self.random.choice(self.world.channels),
+                self.random.choice(self.world.members[:3]),
+                message.content,
+                stickers=message.stickers,
+                attachments=message.attachments,
+            )
+            copies.append(copy)
+        return copies
+
+    def suspect(self, length: int = 64) -> stubs.Message:
+        """A message carrying content, a sticker and an attachment."""
+        text, _ = self.content(length)
+        return stubs.Message(
+            self.random.choice(self.world.channels),
+            self.random.choice(self.world.members),
+            text,
+            stickers=(self.stickers[0],),
+            attachments=(stubs.Attachment("image.png", 1000),),
+        )
+
+
+def bench_detections(
+    corpus: Corpus, selected: typing.Callable[[str], bool]
+) -> list[Series]:
+    results = []
+    # the stubs only implement what the components read
+    windows = {
+        size: typing.cast(list[hikari.Message], corpus.window(size)) for size in WINDOWS
+    }
+    message = typing.cast(hikari.Message, corpus.suspect())
+    for mit in mitigations:
+        name = f"{mit.name}.detection"
+        if not selected(name):
+            continue
+        points = []
+        for size, window in windows.items():
+            seconds = measure(lambda: mit.detection(message, window, corpus.guild))
+            points.append((float(size), seconds))
+        results.append(Series(name, "window", points))
+    return results
+
+
+def bench_matches(
+    corpus: Corpus, selected: typing.Callable[[str], bool]
+) -> list[Series]:
+    results = []
+    for mit in mitigations:
+        name = f"{mit.name}.match"
+        if not selected(name):
+            continue
+        suspect = corpus.suspect()
+        data = mit.detection(
+            typing.cast(hikari.Message, suspect),
+            typing.cast(list[hikari.Message], corpus.raid(suspect)),
+            corpus.guild,
+        )
+        if data is None:
+            print(f"{name}: raid window did not trigger a mitigation", file=sys.stderr)
+            continue
+        points = []
+        for length in LENGTHS:
+            message = typing.cast(hikari.Message, corpus.message(length))
+            points.append((float(length), measure(lambda: mit.match(data, message))))
+        results.append(Series(name, "length", points))
+    return results
+
+
+def bench_rules(corpus: Corpus, selected: typing.Callable[[str], bool]) -> list[Series]:
+    results = []
+    for rule in firewall_rules:
+        if not selected(rule.name):
+            continue
+        mixes: tuple[tuple[str, dict[str, float]], ...] = (
+            ("length", {}),
+            ("dense", DENSE),
+        )
+        for axis, mix in mixes:
+            points = []
+            for length in LENGTHS:
+                message = typing.cast(
+                    hikari.Message, corpus.message(length, density=mix)
+                )
+                points.append(
+                    (float(length), measure(lambda: rule.func(message, corpus.guild)))
+                )
+            results.append(Series(rule.name, axis, points))
+
+        for axis in ("mentions", "urls", "escaped"):
+            points = []
+            for density in DENSITIES:
+                message = typing.cast(
+                    hikari.Message,
+                    corpus.message(DENSITY_LENGTH, density={axis: density}),
+                )
+                points.append(
+                    (density, measure(lambda: rule.func(message, corpus.guild)))
+                )
+            results.append(Series(rule.name, axis, points))
+    return results
+
+
+def flatten(results: list[Series]) -> dict[str, float]:
+    return {
+        f"{series.name}/{series.axis}={x:g}": seconds
+        for series in results
+        for x, seconds in series.points
+    }
+
+
+def compare(
+    current: dict[str, float], baseline: dict[str, float], tolerance: float
+) -> list[str]:
+    regressions = []
+    for key, seconds in sorted(current.items()):
+        before = baseline.get(key, None)
+        if before is None or seconds - before < NOISE_FLOOR:
+            continue
+        if seconds > before * tolerance:
+            regressions.append(
+                f"{key}: {before * 1e6:,.1f}µs -> {seconds * 1e6:,.1f}µs "
+                f"({seconds / before:.1f}x)"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "names", nargs="*", help="only run benchmarks starting with these names"
+    )
+    parser.add_argument("--save", type=Path, help="write the results as a baseline")
+    parser.add_argument("--compare", type=Path, help="baseline to compare against")
+    parser.add_argument(
+        "--tolerance", type=float, default=1.5, help="allowed slowdown factor"
+    )
+    args = parser.parse_args()
+
+    def selected(name: str) -> bool:
+        return not args.names or any(name.startswith(x) for x in args.names)
+
+    corpus = Corpus()
+    results = [
+        *bench_detections(corpus, selected),
+        *bench_matches(corpus, selected),
+        *bench_rules(corpus, selected),
+    ]
+    for series in results:
+        print(series.format())
+
+    current = flatten(results)
+    if args.save:
+        args.save.write_text(json.dumps(current, indent=2, sort_keys=True))
+    if args.compare:
+        regressions = compare(
+            current, json.loads(args.compare.read_text()), args.tolerance
+        )
+        if regressions:
+            print(f"\n{len(regressions)} regressions:", *regressions, sep="\n  ")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Replays synthetic event streams through the guild components.
+
+    python -m bench.pipeline
+    python -m bench.pipeline chat phishing-wave --events 20000 --guilds 4
+
+Events run through `GuildWorker.event`, the same code path as production, so
+the per-component numbers come from the regular guild instruments.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+import typing
+from pathlib import Path
+
+from clend.guild.ext import GuildExtension, GuildWorker
+from clend.guild.guild import CleanerGuild
+from clend.shared.instrument import Histogram
+
+from . import streams, stubs
+
+
+class Report(typing.NamedTuple):
+    scenario: str
+    events: int
+    guilds: int
+    seconds: float
+    memory_per_guild: int
+    actions: dict[str, int]
+    components: dict[str, Histogram]
+
+    @property
+    def events_per_second(self) -> float:
+        return self.events / self.seconds if self.seconds else 0.0
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        return {
+            "scenario": self.scenario,
+            "events": self.events,
+            "guilds": self.guilds,
+            "seconds": self.seconds,
+            "events_per_second": self.events_per_second,
+            "memory_per_guild": self.memory_per_guild,
+            "actions": self.actions,
+            "components": {
+                name: {
+                    "count": histogram.count,
+                    "p50": histogram.quantile(0.5),
+                    "p99": histogram.quantile(0.99),
+                    "max": histogram.max,
+                }
+                for name, histogram in self.components.items()
+                if histogram.count
+            },
+        }
+
+    def format(self) -> str:
+        lines = [
+            f"{self.scenario}: {self.events:,} events over {self.guilds} guilds in "
+            f"{self.seconds:.3f}s, {self.events_per_second:,.0f} events/s, "
+            f"{self.memory_per_guild / 1024:,.1f} KiB/guild",
+            "  actions: "
+            + (", ".join(f"{k}={v}" for k, v in sorted(self.actions.items())) or "-"),
+        ]
+        for name, histogram in sorted(
+            self.components.items(), key=lambda item: -item[1].total
+        ):
+            if not histogram.count:
+                continue
+            lines.append(
+                f"  {histogram.quantile(0.5) * 1e6:>9.1f}µs p50 "
+                f"{histogram.quantile(0.99) * 1e6:>9.1f}µs p99 "
+                f"{histogram.max * 1e6:>9.1f}µs max  {name}"
+            )
+        return "\n".join(lines)
+
+
+def prepare(
+    scenario: str,
+    events: int,
+    guilds: int,
+    worker: str | None = None,
+    app: stubs.App | None = None,
+) -> tuple[GuildWorker, list[tuple[CleanerGuild, typing.Any]], list[streams.World]]:
+    if app is None:
+        app = stubs.App(stubs.guild_data(worker))
+    ext = GuildExtension(app)  # type: ignore
+    ext.instruments.report_threshold = float("inf")
+    for stub_type, event_type in stubs.EVENT_TYPES.items():
+        ext.callbacks[stub_type] = ext.callbacks.get(event_type, [])
+        ext.callback_ids[stub_type] = ext.callback_ids.get(event_type, ())
+    worker_ = GuildWorker(ext, 0, 1)
+
+    generate = streams.scenarios[scenario]
+    worlds = []
+    per_guild = []
+    for index in range(guilds):
+        world = streams.World(1 + index)
+        guild = CleanerGuild(world.guild.id, app)  # type: ignore
+        guild.settings_loaded = True
+        ext.guilds[guild.id] = guild
+        per_guild.append([(guild, event) for event in generate(world, events)])
+        worlds.append(world)
+
+    # interleave the guilds like the gateway would
+    queue = [item for items in zip(*per_guild) for item in items]
+    return worker_, queue, worlds
+
+
+def replay(
+    scenario: str, events: int, guilds: int = 1, worker: str | None = None
+) -> Report:
+    worker_, queue, _ = prepare(scenario, events, guilds, worker)
+    gc.collect()
+    start = time.perf_counter()
+    for guild, event in queue:
+        worker_.event(event, guild)
+    seconds = time.perf_counter() - start
+
+    app = worker_.ext.app
+    return Report(
+        scenario,
+        len(queue),
+        guilds,
+        seconds,
+        measure_memory(scenario, events, guilds, worker),
+        dict(app.store.actions),  # type: ignore
+        worker_.ext.instruments.histograms(),
+    )
+
+
+def measure_memory(
+    scenario: str, events: int, guilds: int, worker: str | None = None
+) -> int:
+    """Memory retained by the guild state after replaying the stream."""
+    worker_, queue, _ = prepare(scenario, events, guilds, worker)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        for guild, event in queue:
+            worker_.event(event, guild)
+        del queue
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return max(after - before, 0) // guilds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "scenarios", nargs="*", help=f"default: {', '.join(streams.scenarios)}"
+    )
+    parser.add_argument("--events", type=int, default=1000, help="events per guild")
+    parser.add_argument("--guilds", type=int, default=1)
+    parser.add_argument("--worker", type=Path, help="lua worker script to enable")
+    parser.add_argument("--json", type=Path, help="also write the results here")
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios) - set(streams.scenarios)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    worker = args.worker.read_text() if args.worker else None
+    reports = []
+    for scenario in args.scenarios or streams.scenarios:
+        report = replay(scenario, args.events, args.guilds, worker)
+        print(report.format(), end="\n\n")
+        reports.append(report.to_dict())
+
+    if args.json:
+        args.json.write_text(json.dumps(reports, indent=2))
+
+
+if __name__ == "__main__":
+    main()
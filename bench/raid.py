@@ -0,0 +1,272 @@
+"""
+Offline raid simulator. Events are fed through the guild components at a fixed
+rate, the resulting actions are handled by the real `HTTPService` and its REST
+calls go to a local stand-in for the Discord API.
+
+    python -m bench.raid
+    python -m bench.raid copy-paste-raid --events 500 --rate 100
+
+For every scenario it reports how long it took until the raiders were dealt
+with and their messages deleted, and how many REST calls that needed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import collections
+import json
+import time
+import typing
+from pathlib import Path
+
+import hikari
+
+from clend.http.http import HTTPService
+from clend.shared.data import GuildData
+from clend.shared.protect import protect
+
+from . import pipeline, streams, stubs
+from .discord import BOT_ID, FakeDiscord
+
+RAID_SCENARIOS = ("copy-paste-raid", "sticker-spam", "join-flood", "phishing-wave")
+CHALLENGE_BUCKETS = ("kick_user", "ban_user", "edit_member", "add_role", "remove_role")
+# the log and delete loops run every second, give them time to catch up
+IDLE_AFTER = 3.0
+
+
+class Database:
+    """The few redis commands HTTPService uses, kept in memory."""
+
+    def __init__(self) -> None:
+        self.data: dict[str, typing.Any] = {}
+
+    async def sadd(self, key: str, members: typing.Iterable[typing.Any]) -> int:
+        values = self.data.setdefault(key, set())
+        before = len(values)
+        values.update(members)
+        return len(values) - before
+
+    async def exists(self, keys: typing.Iterable[str]) -> int:
+        return sum(key in self.data for key in keys)
+
+    async def set(self, key: str, value: typing.Any, ex: int | None = None) -> bool:
+        self.data[key] = value
+        return True
+
+
+class Cache:
+    def __init__(self) -> None:
+        self.me = stubs.User("The Cleaner", is_bot=True)
+
+    def get_guild(self, guild_id: int) -> None:
+        return None  # HTTPService falls back to en-US and the fallback log channel
+
+    def get_me(self) -> stubs.User:
+        return self.me
+
+
+class Bot:
+    def __init__(self, rest: hikari.api.RESTClient) -> None:
+        self.rest = rest
+        self.cache = Cache()
+
+
+class Metrics:
+    def __init__(self) -> None:
+        self.queue: asyncio.Queue[typing.Any] = asyncio.Queue()
+
+
+class Store(stubs.Store):
+    def __init__(self, app: App, data: GuildData) -> None:
+        super().__init__(data)
+        self.app = app
+
+    def put_http(self, *items: typing.Any, thread_safe: bool = False) -> None:
+        super().put_http(*items)
+        queue = self.app.http.main_queue.async_q
+        for item in items:
+            if item is not None:
+                queue.put_nowait(item)
+
+    def get_bot_id(self) -> int:
+        return BOT_ID
+
+
+class App(stubs.App):
+    def __init__(self, rest: hikari.api.RESTClient, data: GuildData) -> None:
+        self.bot = Bot(rest)
+        self.database = Database()
+        self.store = Store(self, data)
+        self.extensions: dict[str, typing.Any] = {"clend.metrics": Metrics()}
+        self.http = HTTPService(self)  # type: ignore
+
+
+class RaidReport(typing.NamedTuple):
+    scenario: str
+    events: int
+    feed_seconds: float
+    raiders: int
+    raiders_actioned: int
+    innocent_actioned: int
+    raid_messages: int
+    raid_messages_deleted: int
+    time_to_mitigate: float | None
+    time_to_clean: float | None
+    rest_calls: dict[str, int]
+    rate_limited: dict[str, int]
+
+    def format(self) -> str:
+        def seconds(value: float | None) -> str:
+            return "never" if value is None else f"{value:.2f}s"
+
+        calls = ", ".join(f"{k}={v}" for k, v in sorted(self.rest_calls.items()))
+        limited = ", ".join(f"{k}={v}" for k, v in sorted(self.rate_limited.items()))
+        return "\n".join(
+            (
+                f"{self.scenario}: {self.events:,} events fed in "
+                f"{self.feed_seconds:.2f}s",
+                f"  raiders actioned {self.raiders_actioned}/{self.raiders} "
+                f"after {seconds(self.time_to_mitigate)}, "
+                f"innocent actioned {self.innocent_actioned}",
+                f"  raid messages deleted "
+                f"{self.raid_messages_deleted}/{self.raid_messages} "
+                f"after {seconds(self.time_to_clean)}",
+                f"  {sum(self.rest_calls.values())} REST calls: {calls or '-'}",
+                f"  429 responses: {limited or '-'}",
+            )
+        )
+
+
+async def simulate(
+    scenario: str, events: int, rate: float, guilds: int = 1, timeout: float = 120
+) -> RaidReport:
+    discord = FakeDiscord()
+    rest = hikari.RESTApp(url=await discord.start()).acquire("token", "Bot")
+    rest.start()
+    app = App(rest, stubs.guild_data())
+    http = app.http
+    tasks = [
+        asyncio.create_task(protect(http.ind)),
+        asyncio.create_task(protect(http.logd)),
+        asyncio.create_task(protect(http.deleted)),
+    ]
+
+    try:
+        worker, queue, worlds = pipeline.prepare(scenario, events, guilds, app=app)
+        start = time.monotonic()
+        for index, (guild, event) in enumerate(queue):
+            worker.event(event, guild)
+            delay = start + (index + 1) / rate - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        feed_seconds = time.monotonic() - start
+
+        deadline = start + timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.5)
+            last_call = discord.calls[-1].timestamp if discord.calls else start
+            if (
+                time.monotonic() - last_call > IDLE_AFTER
+                and http.main_queue.async_q.empty()
+                and http.log_queue.empty()
+                and http.delete_queue.empty()
+            ):
+                break
+    finally:
+        for task in tasks:
+            task.cancel()
+        # announcements wait before deleting themselves
+        for task in asyncio.all_tasks() - {asyncio.current_task()}:
+            task.cancel()
+        await rest.close()
+        await discord.close()
+
+    raiders = set().union(*(world.raiders for world in worlds))
+    raid_messages = {k: v for world in worlds for k, v in world.raid_messages.items()}
+    return analyse(
+        scenario, len(queue), feed_seconds, start, discord, raiders, raid_messages
+    )
+
+
+def analyse(
+    scenario: str,
+    events: int,
+    feed_seconds: float,
+    start: float,
+    discord: FakeDiscord,
+    raiders: set[int],
+    raid_messages: dict[int, int],
+) -> RaidReport:
+    actioned: dict[int, float] = {}
+    deleted: dict[int, float] = {}
+    purged: dict[int, float] = {}  # banned with their recent messages
+    rest_calls: collections.Counter[str] = collections.Counter()
+    for call in discord.calls:
+        rest_calls[call.bucket] += 1
+        if call.bucket in CHALLENGE_BUCKETS:
+            actioned.setdefault(call.params[1], call.timestamp)
+            if call.bucket == "ban_user" and (call.body or {}).get(
+                "delete_message_days", 0
+            ):
+                purged.setdefault(call.params[1], call.timestamp)
+        elif call.bucket == "delete_message":
+            deleted.setdefault(call.params[1], call.timestamp)
+        elif call.bucket == "bulk_delete":
+            for message_id in call.body["messages"]:
+                deleted.setdefault(int(message_id), call.timestamp)
+
+    raider_times = [actioned[user] for user in raiders if user in actioned]
+    message_times = []
+    for message, author in raid_messages.items():
+        times = [
+            x[key] for x, key in ((deleted, message), (purged, author)) if key in x
+        ]
+        if times:
+            message_times.append(min(times))
+    return RaidReport(
+        scenario,
+        events,
+        feed_seconds,
+        len(raiders),
+        len(raider_times),
+        len(actioned.keys() - raiders),
+        len(raid_messages),
+        len(message_times),
+        max(raider_times) - start if raider_times else None,
+        max(message_times) - start if message_times else None,
+        dict(rest_calls),
+        dict(discord.rate_limited),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "scenarios", nargs="*", help=f"default: {', '.join(RAID_SCENARIOS)}"
+    )
+    parser.add_argument("--events", type=int, default=300, help="events per guild")
+    parser.add_argument("--guilds", type=int, default=1)
+    parser.add_argument("--rate", type=float, default=50, help="events per second")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--json", type=Path, help="also write the results here")
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios) - set(streams.scenarios)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    reports = []
+    for scenario in args.scenarios or RAID_SCENARIOS:
+        report = asyncio.run(
+            simulate(scenario, args.events, args.rate, args.guilds, args.timeout)
+        )
+        print(report.format(), end="\n\n")
+        reports.append(report._asdict())
+
+    if args.json:
+        args.json.write_text(json.dumps(reports, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Synthetic event streams. Each scenario yields stub events for a single guild.
+"""
+
+from __future__ import annotations
+
+import random
+import string
+import typing
+
+from . import stubs
+
+Stream = typing.Iterator[stubs.MessageCreateEvent | stubs.MemberCreateEvent]
+WORDS = (
+    "the be to of and a in that have it for not on with he as you do at this but "
+    "his by from they we say her she or an will my one all would there their what "
+    "so up out if about who get which go me when make can like time no just him "
+    "know take people into year your good some could them see other than then now "
+    "look only come its over think also back after use two how our work first well "
+    "way even new want because any these give day most us gg lol ok nice thanks"
+).split()
+PHISHING_DOMAINS = (
+    "dlscord-nitro.gift",
+    "discorcl.com",
+    "steamcommunlty.ru",
+    "discord-airdrop.xyz",
+    "nitro-free.click",
+)
+
+
+class World:
+    """A guild with regular members and a couple of channels."""
+
+    def __init__(self, guild_id: int, members: int = 200, channels: int = 5) -> None:
+        self.random = random.Random(guild_id)
+        self.guild = stubs.Guild(guild_id)
+        self.channels = [
+            self.guild.add_channel(f"channel-{i}") for i in range(channels)
+        ]
+        self.members = [
+            self.guild.add_member(
+                f"member{i}",
+                created_at=stubs.member_age(self.random.uniform(30, 2000)),
+                avatar_hash="a" * 32,
+            )
+            for i in range(members)
+        ]
+        # ground truth for the raid simulator
+        self.raiders: set[int] = set()
+        self.raid_messages: dict[int, int] = {}  # message id -> author id
+
+    def sentence(self, words: int | None = None) -> str:
+        if words is None:
+            words = self.random.randint(1, 20)
+        return " ".join(self.random.choice(WORDS) for _ in range(words))
+
+    def message(
+        self,
+        member: stubs.Member,
+        content: str | None,
+        channel: stubs.Channel | None = None,
+        malicious: bool = False,
+        **kwargs: typing.Any,
+    ) -> stubs.MessageCreateEvent:
+        if channel is None:
+            channel = self.random.choice(self.channels)
+        message = stubs.Message(channel, member, content, **kwargs)
+        if malicious:
+            self.raiders.add(member.id)
+            self.raid_messages[message.id] = member.id
+        return stubs.MessageCreateEvent(message, channel)
+
+    def join(
+        self, username: str, age: float, malicious: bool = False
+    ) -> stubs.MemberCreateEvent:
+        member = self.guild.add_member(username, created_at=stubs.member_age(age))
+        if malicious:
+            self.raiders.add(member.id)
+        return stubs.MemberCreateEvent(member)
+
+    def raider_name(self) -> str:
+        return "".join(self.random.choices(string.ascii_lowercase, k=10))
+
+
+def chat(world: World, events: int) -> Stream:
+    """Normal conversation with the occasional mention, link or emoji."""
+    rng = world.random
+    for _ in range(events):
+        member = rng.choice(world.members)
+        content = world.sentence()
+        kwargs: dict[str, typing.Any] = {}
+        roll = rng.random()
+        if roll < 0.05:
+            mentioned = rng.choice(world.members)
+            content = f"<@{mentioned.id}> {content}"
+            kwargs["user_mentions"] = (mentioned.id,)
+        elif roll < 0.08:
+            content += " https://github.com/cleaner-bot"
+        elif roll < 0.1:
+            content += " :smile: :thumbsup:"
+        elif roll < 0.11:
+            content = f"`@everyone` {content}"
+        yield world.message(member, content, **kwargs)
+
+
+def copy_paste_raid(world: World, events: int) -> Stream:
+    """Fresh accounts join and post the same text with small variations."""
+    rng = world.random
+    text = "JOIN NOW " + world.sentence(12) + " discord.gg/raid"
+    raiders = []
+    for _ in range(max(events // 5, 1)):
+        event = world.join(world.raider_name(), rng.uniform(0, 2), malicious=True)
+        raiders.append(event.member)
+        yield event
+    for index in range(events - len(raiders)):
+        suffix = "".join(rng.choices(string.ascii_letters, k=rng.randint(0, 4)))
+        yield world.message(rng.choice(raiders), f"{text} {suffix}", malicious=True)
+        if index % 10 == 0:  # legitimate chat keeps going
+            yield world.message(rng.choice(world.members), world.sentence())
+
+
+def sticker_spam(world: World, events: int) -> Stream:
+    """A handful of members spamming the same stickers across channels."""
+    rng = world.random
+    stickers = [stubs.Sticker(749054660769218631 + i) for i in range(3)]
+    spammers = rng.sample(world.members, 5)
+    for _ in range(events):
+        if rng.random() < 0.7:
+            yield world.message(
+                rng.choice(spammers),
+                None,
+                stickers=(rng.choice(stickers),),
+                malicious=True,
+            )
+        else:
+            yield world.message(rng.choice(world.members), world.sentence())
+
+
+def join_flood(world: World, events: int) -> Stream:
+    """Accounts created within the same hour joining as fast as possible."""
+    rng = world.random
+    for _ in range(events):
+        yield world.join(world.raider_name(), rng.uniform(0, 0.04), malicious=True)
+
+
+def phishing_wave(world: World, events: int) -> Stream:
+    """Compromised accounts posting fake nitro links between normal chat."""
+    rng = world.random
+    for _ in range(events):
+        member = rng.choice(world.members)
+        if rng.random() < 0.3:
+            domain = rng.choice(PHISHING_DOMAINS)
+            path = "".join(rng.choices(string.ascii_letters, k=16))
+            content = (
+                f"@everyone Free Discord Nitro for 3 months from Steam "
+                f"https://{domain}/{path}"
+            )
+            yield world.message(member, content, malicious=True)
+        else:
+            yield world.message(member, world.sentence())
+
+
+scenarios: dict[str, typing.Callable[[World, int], Stream]] = {
+    "chat": chat,
+    "copy-paste-raid": copy_paste_raid,
+    "sticker-spam": sticker_spam,
+    "join-flood": join_flood,
+    "phishing-wave": phishing_wave,
+}
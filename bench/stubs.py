@@ -0,0 +1,290 @@
+"""
+Minimal stand-ins for the hikari objects the guild components read. They only
+implement the attributes and methods the components actually use.
+"""
+
+from __future__ import annotations
+
+import collections
+import itertools
+import typing
+from datetime import datetime, timedelta, timezone
+
+import hikari
+
+from clend.guild.components.mitigations import mitigations
+from clend.guild.components.rules import firewall_rules
+from clend.shared.data import GuildConfig, GuildData, GuildEntitlements, GuildWorker
+
+EPOCH = datetime(2022, 9, 1, tzinfo=timezone.utc)
+_sequence = itertools.count(1)
+
+
+def snowflake(at: datetime | None = None) -> hikari.Snowflake:
+    """Unique snowflake, `at` sets its creation time."""
+    base = hikari.Snowflake.from_datetime(at or datetime.now(timezone.utc))
+    return hikari.Snowflake(int(base) + next(_sequence) % (1 << 22))
+
+
+class Role:
+    def __init__(self, id: int, position: int, permissions: hikari.Permissions) -> None:
+        self.id = hikari.Snowflake(id)
+        self.position = position
+        self.permissions = permissions
+
+    def sort_key(self) -> int:
+        return self.position
+
+
+class User:
+    def __init__(
+        self,
+        username: str,
+        created_at: datetime | None = None,
+        avatar_hash: str | None = None,
+        is_bot: bool = False,
+    ) -> None:
+        self.id = snowflake(created_at or EPOCH)
+        self.username = username
+        self.discriminator = "0001"
+        self.avatar_hash = avatar_hash
+        self.flags = hikari.UserFlag.NONE
+        self.is_bot = is_bot
+
+    @property
+    def created_at(self) -> datetime:
+        return self.id.created_at
+
+    def __str__(self) -> str:
+        return f"{self.username}#{self.discriminator}"
+
+    def make_avatar_url(self, **kwargs: typing.Any) -> None:
+        return None
+
+
+class Member(User):
+    def __init__(
+        self,
+        guild: Guild,
+        username: str,
+        created_at: datetime | None = None,
+        roles: typing.Sequence[Role] = (),
+        **kwargs: typing.Any,
+    ) -> None:
+        super().__init__(username, created_at, **kwargs)
+        self.guild = guild
+        self.guild_id = guild.id
+        self.roles = [guild.everyone, *roles]
+        self.role_ids = [role.id for role in self.roles]
+        self.nickname: str | None = None
+        self.joined_at = datetime.now(timezone.utc)
+
+    @property
+    def user(self) -> Member:
+        return self
+
+    @property
+    def display_name(self) -> str:
+        return self.nickname or self.username
+
+    def get_guild(self) -> Guild:
+        return self.guild
+
+    def get_roles(self) -> list[Role]:
+        return self.roles
+
+    def get_top_role(self) -> Role:
+        return max(self.roles, key=Role.sort_key)
+
+    def communication_disabled_until(self) -> None:
+        return None
+
+
+class Channel:
+    def __init__(self, guild: Guild, name: str) -> None:
+        self.id = snowflake()
+        self.guild = guild
+        self.guild_id = guild.id
+        self.name = name
+        self.permission_overwrites: dict[int, hikari.PermissionOverwrite] = {}
+
+    def get_guild(self) -> Guild:
+        return self.guild
+
+
+class Attachment:
+    def __init__(self, filename: str, size: int) -> None:
+        self.id = snowflake()
+        self.filename = filename
+        self.media_type = "image/png"
+        self.size = size
+        self.url = f"https://cdn.discordapp.com/attachments/{self.id}/{filename}"
+        self.proxy_url = self.url
+        self.height = self.width = 256
+
+
+class Sticker:
+    def __init__(self, id: int) -> None:
+        self.id = hikari.Snowflake(id)
+        self.name = f"sticker{id}"
+        self.image_url = f"https://media.discordapp.net/stickers/{id}.png"
+
+
+class Message:
+    def __init__(
+        self,
+        channel: Channel,
+        member: Member,
+        content: str | None,
+        *,
+        user_mentions: typing.Sequence[int] = (),
+        role_mentions: typing.Sequence[int] = (),
+        embeds: typing.Sequence[hikari.Embed] = (),
+        attachments: typing.Sequence[Attachment] = (),
+        stickers: typing.Sequence[Sticker] = (),
+    ) -> None:
+        self.id = snowflake()
+        self.channel_id = channel.id
+        self.guild_id = channel.guild_id
+        self.content = content
+        self.author = self.member = member
+        self.user_mentions_ids = [hikari.Snowflake(x) for x in user_mentions]
+        self.role_mention_ids = [hikari.Snowflake(x) for x in role_mentions]
+        self.channel_mention_ids: list[hikari.Snowflake] = []
+        self.mentions_everyone = False
+        self.embeds = list(embeds)
+        self.attachments = list(attachments)
+        self.stickers = list(stickers)
+        self.type = hikari.MessageType.DEFAULT
+        self.application_id = None
+        self.interaction = None
+
+
+class MessageCreateEvent:
+    def __init__(self, message: Message, channel: Channel) -> None:
+        self.message = message
+        self.channel = channel
+        self.guild_id = channel.guild_id
+        self.channel_id = channel.id
+        self.message_id = message.id
+        self.member = message.member
+        self.author_id = message.member.id
+        self.is_bot = message.member.is_bot
+        self.content = message.content
+
+    def get_channel(self) -> Channel:
+        return self.channel
+
+    def get_guild(self) -> Guild:
+        return self.channel.guild
+
+
+class MemberCreateEvent:
+    def __init__(self, member: Member) -> None:
+        self.member = self.user = member
+        self.user_id = member.id
+        self.guild_id = member.guild_id
+
+    def get_guild(self) -> Guild:
+        return self.member.guild
+
+
+class Guild:
+    def __init__(self, id: int) -> None:
+        self.id = hikari.Snowflake(id)
+        self.everyone = Role(id, 0, hikari.Permissions.SEND_MESSAGES)
+        self.roles: dict[hikari.Snowflake, Role] = {self.everyone.id: self.everyone}
+        self.members: dict[int, Member] = {}
+        self.channels: dict[int, Channel] = {}
+
+        bot_role = self.add_role(100, hikari.Permissions.ADMINISTRATOR)
+        self.me = self.add_member("The Cleaner", roles=(bot_role,), is_bot=True)
+        self.owner_id = self.add_member("owner").id
+
+    def add_role(self, position: int, permissions: hikari.Permissions) -> Role:
+        role = Role(snowflake(), position, permissions)
+        self.roles[role.id] = role
+        return role
+
+    def add_member(self, username: str, **kwargs: typing.Any) -> Member:
+        member = Member(self, username, **kwargs)
+        self.members[member.id] = member
+        return member
+
+    def add_channel(self, name: str) -> Channel:
+        channel = Channel(self, name)
+        self.channels[channel.id] = channel
+        return channel
+
+    def get_my_member(self) -> Member:
+        return self.me
+
+    def get_member(self, user_id: int) -> Member | None:
+        return self.members.get(user_id, None)
+
+    def get_role(self, role_id: int) -> Role | None:
+        return self.roles.get(hikari.Snowflake(role_id), None)
+
+    def get_channel(self, channel_id: int) -> Channel | None:
+        return self.channels.get(channel_id, None)
+
+
+def guild_data(worker: str | None = None) -> GuildData:
+    """Settings with every rule and mitigation enabled."""
+    config: dict[str, typing.Any] = {
+        "slowmode_enabled": True,
+        "antiraid_enabled": True,
+        "antiraid_limit": "10/30",
+        "logging_enabled": True,
+        "logging_option_join": True,
+        "logging_option_leave": True,
+        "general_dehoisting_enabled": True,
+        "impersonation_discord_enabled": True,
+        "workers_enabled": worker is not None,
+        "logging_downloads_enabled": False,
+    }
+    for rule in firewall_rules:
+        config[f"rules_{rule.name.replace('.', '_')}"] = 2
+    for mitigation in mitigations:
+        config[f"antispam_{'_'.join(mitigation.name.split('.')[1:])}"] = True
+
+    entitlements: dict[str, typing.Any] = {}
+    if worker is not None:
+        entitlements = {"plan": 2, "workers": 0}
+    return GuildData(
+        GuildConfig(**config),
+        GuildEntitlements(**entitlements),
+        GuildWorker(worker or ""),
+    )
+
+
+# lets the stubs be dispatched like the hikari events they stand in for
+EVENT_TYPES: dict[type, typing.Type[hikari.Event]] = {
+    MessageCreateEvent: hikari.GuildMessageCreateEvent,
+    MemberCreateEvent: hikari.MemberCreateEvent,
+}
+
+
+class Store:
+    """Stand-in for `clend.store.Store` that collects the actions."""
+
+    def __init__(self, data: GuildData) -> None:
+        self.data = data
+        self.actions: collections.Counter[str] = collections.Counter()
+
+    def get_data(self, guild_id: int) -> GuildData:
+        return self.data
+
+    def put_http(self, *items: typing.Any, thread_safe: bool = False) -> None:
+        for item in items:
+            if item is not None:
+                self.actions[type(item).__name__] += 1
+
+
+class App:
+    def __init__(self, data: GuildData) -> None:
+        self.store = Store(data)
+
+
+def member_age(days: float) -> datetime:
+    return datetime.now(timezone.utc) - timedelta(days=days)
@@ -1,5 +1,7 @@
 import asyncio
 import hashlib
+import heapq
+import itertools
 import logging
 import typing
 from datetime import datetime
@@ -17,13 +19,25 @@ from ..shared.dangerous import DANGEROUS_PERMISSIONS, dangerous_content
 from ..shared.event import ILog
 from ..shared.id import time_passed_since
 from ..shared.protect import protect, protected_call
-from ..shared.risk import calculate_risk_score
+from ..shared.risk import risk_score
 from ..shared.sub import Message as PubMessage
 from ..shared.sub import listen as pubsub_listen
 from ..shared.timing import Timed
 
 logger = logging.getLogger(__name__)
 REQUIRED_TO_SEND = hikari.Permissions.VIEW_CHANNEL | hikari.Permissions.SEND_MESSAGES
+FLOW_TTL = 300
+# one round trip for the interaction: a member is challenged when forced to or
+# when their risk is too high, only then a flow is created
+CREATE_FLOW = """
+local forced = redis.call("SISMEMBER", KEYS[1], ARGV[1])
+if forced == 0 and ARGV[3] == "0" then
+    return 0
+end
+redis.call("HSET", KEYS[2], "user", ARGV[1], "guild", ARGV[2])
+redis.call("EXPIRE", KEYS[2], ARGV[4])
+return 1
+"""
 
 
 def get_min_risk(config: GuildConfig, entitlements: GuildEntitlements) -> float | None:
@@ -39,6 +53,11 @@ def get_min_risk(config: GuildConfig, entitlements: GuildEntitlements) -> float
 class ChallengeExtension:
     listeners: list[tuple[typing.Type[hikari.Event], typing.Any]]
     task: asyncio.Task[None] | None = None
+    # guild id -> heap of (-risk, order, member, role id)
+    joins: dict[int, list[tuple[float, int, hikari.Member, int]]]
+    join_tasks: dict[int, asyncio.Task[None]]
+    # guild id -> (configured role id, the role if the bot can give it)
+    eligible_roles: dict[int, tuple[int, hikari.Role | None]]
 
     def __init__(self, app: TheCleanerApp):
         self.app = app
@@ -46,7 +65,14 @@ class ChallengeExtension:
             (hikari.MemberCreateEvent, self.on_member_create),
             (hikari.MemberUpdateEvent, self.on_member_update),
             (hikari.InteractionCreateEvent, self.on_interaction_create),
+            (hikari.RoleUpdateEvent, self.on_role_change),
+            (hikari.RoleDeleteEvent, self.on_role_change),
         ]
+        self.joins = {}
+        self.join_tasks = {}
+        self.eligible_roles = {}
+        self.join_order = itertools.count()
+        self.create_flow_script = app.database.register_script(CREATE_FLOW)
 
     def on_load(self) -> None:
         self.task = asyncio.create_task(protect(self.verifyd))
@@ -54,6 +80,13 @@ class ChallengeExtension:
     def on_unload(self) -> None:
         if self.task is not None:
             self.task.cancel()
+        for task in self.join_tasks.values():
+            task.cancel()
+
+    async def on_role_change(
+        self, event: hikari.RoleUpdateEvent | hikari.RoleDeleteEvent
+    ) -> None:
+        self.eligible_roles.pop(event.guild_id, None)
 
     async def on_member_create(self, event: hikari.MemberCreateEvent) -> None:
         if event.user.is_bot or event.member.is_pending is True:
@@ -61,6 +94,12 @@ class ChallengeExtension:
         await self.member_joined(event.member)
 
     async def on_member_update(self, event: hikari.MemberUpdateEvent) -> None:
+        me = self.app.bot.get_me()
+        if me is not None and event.user_id == me.id:
+            # our roles changed, and with them what we are allowed to give
+            self.eligible_roles.pop(event.guild_id, None)
+            return
+
         old_member = event.old_member
         if (
             event.user.is_bot
@@ -88,43 +127,88 @@ class ChallengeExtension:
         if min_risk is None:  # its off
             return
 
-        actual_risk = calculate_risk_score(member.user)
+        actual_risk = risk_score(member.user)
         if actual_risk < min_risk:
             return
 
-        guild = member.get_guild()
+        role = self.challenge_role(
+            member.guild_id, int(config.challenge_interactive_role)
+        )
+        if role is None or role.id in member.role_ids:
+            return
+
+        queue = self.joins.setdefault(member.guild_id, [])
+        heapq.heappush(queue, (-actual_risk, next(self.join_order), member, role.id))
+        if member.guild_id not in self.join_tasks:
+            self.join_tasks[member.guild_id] = asyncio.create_task(
+                self.add_roles(member.guild_id)
+            )
+
+    def challenge_role(self, guild_id: int, role_id: int) -> hikari.Role | None:
+        """
+        The challenge role if the bot is able to give it, checked once per
+        configured role until our roles or the guild roles change.
+        """
+        cached = self.eligible_roles.get(guild_id, None)
+        if cached is not None and cached[0] == role_id:
+            return cached[1]
+        role = self.find_challenge_role(guild_id, role_id)
+        self.eligible_roles[guild_id] = (role_id, role)
+        return role
+
+    def find_challenge_role(self, guild_id: int, role_id: int) -> hikari.Role | None:
+        guild = self.app.bot.cache.get_guild(guild_id)
         if guild is None:
-            return  # this should never happen
+            return None  # this should never happen
 
-        role = guild.get_role(int(config.challenge_interactive_role))
-        if (
-            role is None
-            or role.is_managed
-            or role.position == 0
-            or role.id in member.role_ids
-        ):
-            return
+        role = guild.get_role(role_id)
+        if role is None or role.is_managed or role.position == 0:
+            return None
 
         me = guild.get_my_member()
         if me is None:
-            return
+            return None
 
         top_role = me.get_top_role()
         if top_role is not None and role.position >= top_role.position:
-            return
+            return None
 
         for my_role in me.get_roles():
             if my_role.permissions & hikari.Permissions.ADMINISTRATOR:
-                break
+                return role
             elif my_role.permissions & hikari.Permissions.MANAGE_ROLES:
-                break
-        else:
-            return
+                return role
+        return None
+
+    async def add_roles(self, guild_id: int) -> None:
+        """
+        Give the challenge role to the queued members of a guild, riskiest
+        first and one at a time, as they share the rate limit of the guild.
+        Guilds don't wait for each other, a flooded guild only waits on its
+        own rate limit.
+        """
+        queue = self.joins[guild_id]
+        try:
+            while queue:
+                _, _, member, role_id = heapq.heappop(queue)
+                # cached, unless the roles changed while the member was queued
+                if self.challenge_role(guild_id, role_id) is None:
+                    continue
+                await protected_call(self.add_role(member, role_id))
+        finally:
+            if not queue:
+                del self.joins[guild_id]
+                del self.join_tasks[guild_id]
 
+    async def add_role(self, member: hikari.Member, role_id: int) -> None:
         try:
-            await member.add_role(role)
+            await member.add_role(role_id)
         except hikari.NotFoundError:
             pass
+        except hikari.ForbiddenError:
+            logger.debug(f"unable to give roles in {member.guild_id}")
+            self.eligible_roles.pop(member.guild_id, None)
+            self.joins[member.guild_id].clear()
 
     async def on_interaction_create(self, event: hikari.InteractionCreateEvent) -> None:
         interaction = event.interaction
@@ -170,7 +254,6 @@ class ChallengeExtension:
     async def create_flow(self, interaction: hikari.ComponentInteraction) -> None:
         timed = Timed(name="create flow", report_threshold=1)
 
-        database = self.app.database
         locale = interaction.locale
         guild = interaction.get_guild()
         if guild is None:
@@ -230,18 +313,6 @@ class ChallengeExtension:
 
         timed.checkpoint("config/member checks")
 
-        forced_challenge = await database.sismember(
-            f"guild:{guild.id}:challenged", member.id
-        )
-        timed.checkpoint("get forced_challenge")
-
-        challenge = True
-
-        if not forced_challenge:
-            min_risk = get_min_risk(config, data.entitlements)
-            actual_risk = calculate_risk_score(member.user)
-            challenge = min_risk is not None and actual_risk >= min_risk
-
         role = guild.get_role(challenge_interactive_role)
         if role is None:
             return await interaction.create_initial_response(
@@ -321,22 +392,24 @@ class ChallengeExtension:
 
         timed.checkpoint("myself checks")
 
+        min_risk = get_min_risk(config, data.entitlements)
+        risky = min_risk is not None and risk_score(member.user) >= min_risk
+        flow = hashlib.sha256(
+            interaction.id.to_bytes(8, "big")
+            + interaction.user.id.to_bytes(8, "big")
+            + bytes.fromhex("aa5e794bb8a5c9a329df1555d89a0be2")
+        ).hexdigest()
+        challenge = await self.create_flow_script(
+            keys=(f"guild:{guild.id}:challenged", f"challenge:flow:{flow}"),
+            args=(member.id, guild.id, int(risky), FLOW_TTL),
+        )
+        timed.checkpoint("create flow")
+
         if challenge:
-            flow = hashlib.sha256(
-                interaction.id.to_bytes(8, "big")
-                + interaction.user.id.to_bytes(8, "big")
-                + bytes.fromhex("aa5e794bb8a5c9a329df1555d89a0be2")
-            ).hexdigest()
             logger.debug(
                 f"created flow for {interaction.user.id}@{interaction.guild_id}: {flow}"
             )
 
-            await self.app.database.hset(
-                f"challenge:flow:{flow}",
-                {"user": interaction.user.id, "guild": guild.id},
-            )
-            await self.app.database.expire(f"challenge:flow:{flow}", 300)
-
             component = self.app.bot.rest.build_action_row()
             url = f"https://challenge.cleanerbot.xyz/{flow}"
             add_link(component, t(locale, "challenge_link"), url)
@@ -440,15 +513,22 @@ class ChallengeExtension:
         if config.challenge_interactive_take_role:
             routine = self.app.bot.rest.remove_role_from_member
 
+        verified = False
         try:
             await routine(guild.id, int(user_id), role.id)
+            verified = True
         except hikari.NotFoundError:
-            return  # use left the guild
+            pass  # use left the guild
         finally:
             # delete flow if user left anyway
-            await self.app.database.delete((f"challenge:flow:{flow}",))
+            pipe = await self.app.database.pipeline(transaction=False)
+            await pipe.delete((f"challenge:flow:{flow}",))
+            if verified:
+                await pipe.srem(f"guild:{guild.id}:challenged", (user_id,))
+            await pipe.execute()
 
-        await self.app.database.srem(f"guild:{guild.id}:challenged", (user_id,))
+        if not verified:
+            return
 
         if config.logging_enabled and config.logging_option_verify:
             user = self.app.bot.cache.get_user(int(user_id))
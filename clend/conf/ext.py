@@ -14,12 +14,14 @@ from ..shared.sub import Message
 from ..shared.sub import listen as pubsub_listen
 
 logger = logging.getLogger(__name__)
+LOADER_CONCURRENCY = 32
 
 
 class ConfigExtension:
     listeners: list[tuple[typing.Type[hikari.Event], typing.Any]]
     _guilds: dict[int, GuildData]
     _races: dict[int, asyncio.Event]
+    loaded: asyncio.Event
     task: asyncio.Task[None] | None = None
 
     def __init__(self, app: TheCleanerApp):
@@ -32,15 +34,25 @@ class ConfigExtension:
 
         self._guilds = {}
         self._races = {}
+        self.loaded = asyncio.Event()
 
     def on_load(self) -> None:
         asyncio.create_task(protected_call(self.loader()))
         self.task = asyncio.create_task(protect(self.updated))
 
     async def loader(self) -> None:
-        for guild_id in tuple(self.app.bot.cache.get_guilds_view().keys()):
-            if guild_id not in self._guilds:
-                await self.fetch_guild(guild_id)
+        semaphore = asyncio.Semaphore(LOADER_CONCURRENCY)
+
+        async def load(guild_id: int) -> None:
+            async with semaphore:
+                await self.ensure_guild(guild_id)
+
+        try:
+            await asyncio.gather(
+                *(load(guild_id) for guild_id in self.app.bot.cache.get_guilds_view())
+            )
+        finally:
+            self.loaded.set()
         logger.info("initial setting fetch done")
 
     def on_unload(self) -> None:
@@ -55,14 +67,19 @@ class ConfigExtension:
 
         self._races[guild_id] = event = asyncio.Event()
         try:
-            guild_config = await self.fetch_dict(
-                f"guild:{guild_id}:config", tuple(GuildConfig.__fields__)
+            config_keys = tuple(GuildConfig.__fields__)
+            entitlement_keys = tuple(GuildEntitlements.__fields__)
+            pipe = await self.app.database.pipeline(transaction=False)
+            await pipe.hmget(f"guild:{guild_id}:config", config_keys)
+            await pipe.hmget(f"guild:{guild_id}:entitlements", entitlement_keys)
+            await pipe.get(f"guild:{guild_id}:worker")
+            results = await pipe.execute()
+            config_values, entitlement_values, guild_worker = typing.cast(
+                tuple[list[bytes | None], list[bytes | None], bytes | None], results
             )
-            guild_entitlements = await self.fetch_dict(
-                f"guild:{guild_id}:entitlements",
-                tuple(GuildEntitlements.__fields__),
-            )
-            guild_worker = await self.app.database.get(f"guild:{guild_id}:worker")
+
+            guild_config = unpack_dict(config_keys, config_values)
+            guild_entitlements = unpack_dict(entitlement_keys, entitlement_values)
             self._guilds[guild_id] = GuildData(
                 GuildConfig.construct(None, **guild_config),
                 GuildEntitlements.construct(None, **guild_entitlements),
@@ -83,11 +100,6 @@ class ConfigExtension:
             return logger.warning("unable to find clend.guild extension")
         guild.send_event(IGuildSettingsAvailable(guild_id))
 
-    async def fetch_dict(self, key: str, keys: tuple[str, ...]) -> dict[str, bytes]:
-        database = self.app.database
-        values = await database.hmget(key, keys)
-        return {k: msgpack.unpackb(v) for k, v in zip(keys, values) if v is not None}
-
     def get_data(self, guild_id: int) -> GuildData | None:
         return self._guilds.get(guild_id, None)
 
@@ -132,3 +144,9 @@ class ConfigExtension:
             if "worker" in data:
                 logger.info(f"changed worker in {data['guild_id']}")
                 gd.worker.source = data["worker"]
+
+
+def unpack_dict(
+    keys: tuple[str, ...], values: typing.Sequence[bytes | None]
+) -> dict[str, typing.Any]:
+    return {k: msgpack.unpackb(v) for k, v in zip(keys, values) if v is not None}
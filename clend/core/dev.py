@@ -1,15 +1,21 @@
 import asyncio
 import logging
+import math
 import os
 import sys
+import time
 import typing
+from pathlib import Path
 
 import hikari
 from hikari.internal.time import utc_datetime
 
 from ..app import TheCleanerApp
+from ..shared.profiler import LoopWatchdog, SamplingProfiler
 
 logger = logging.getLogger(__name__)
+PROFILES = Path("profiles")
+MAX_PROFILE_DURATION = 300
 
 
 class DevExtension:
@@ -20,6 +26,14 @@ class DevExtension:
         self.listeners = [
             (hikari.GuildMessageCreateEvent, self.on_message_create),
         ]
+        self.watchdog = LoopWatchdog()
+        self.profiling = False
+
+    def on_load(self) -> None:
+        self.watchdog.start(asyncio.get_running_loop())
+
+    def on_unload(self) -> None:
+        self.watchdog.stop()
 
     async def on_message_create(self, event: hikari.GuildMessageCreateEvent) -> None:
         if not self.app.is_developer(event.author_id) or event.content is None:
@@ -56,6 +70,12 @@ class DevExtension:
             await self.handle_eval(event)
         elif event.content.startswith("clean!emergency-raid "):
             await self.handle_emergency_raid(event)
+        elif event.content.startswith("clean!profile "):
+            await self.handle_profile(event)
+        elif event.content == "clean!stats":
+            await self.handle_stats(event)
+        elif event.content in ("clean!timings", "clean!timings-reset"):
+            await self.handle_timings(event)
 
     async def handle_ping(self, event: hikari.GuildMessageCreateEvent) -> None:
         sent = utc_datetime()
@@ -278,9 +298,9 @@ class DevExtension:
         if user is None:
             user = await self.app.bot.rest.fetch_user(user_id)
 
-        from ..shared.risk import calculate_risk_score
+        from ..shared.risk import risk_score
 
-        risk = calculate_risk_score(user)
+        risk = risk_score(user)
 
         await event.message.respond(f"risk={int(risk * 100)} ({risk:.2%})")
 
@@ -373,6 +393,63 @@ class DevExtension:
             )
             self.app.store.put_http(challenge)
 
+    async def handle_profile(self, event: hikari.GuildMessageCreateEvent) -> None:
+        assert event.content
+        parts = event.content.split(" ")
+        try:
+            duration = float(parts[1])
+        except (IndexError, ValueError):
+            duration = math.nan
+        if not duration > 0:  # also rejects nan
+            await event.message.respond(
+                f"usage: `clean!profile <seconds>`, at most {MAX_PROFILE_DURATION}"
+            )
+            return
+        duration = min(duration, MAX_PROFILE_DURATION)
+        if self.profiling:
+            await event.message.respond("already profiling")
+            return
+
+        msg = await event.message.respond(f"Profiling for {duration:.0f}s")
+        profiler = SamplingProfiler()
+        self.profiling = True
+        try:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, profiler.run, duration)
+        finally:
+            self.profiling = False
+
+        PROFILES.mkdir(exist_ok=True)
+        path = PROFILES / f"{int(time.time())}.collapsed"
+        profiler.write(path)
+        await msg.edit(
+            f"Done. {profiler.samples:,} samples, "
+            f"{len(profiler.stacks):,} unique stacks, written to `{path}`",
+            attachment=hikari.File(path),
+        )
+
+    async def handle_stats(self, event: hikari.GuildMessageCreateEvent) -> None:
+        stats = self.app.extensions.get("clend.stats")
+        if stats is None:
+            await event.message.respond("`clend.stats` not loaded")
+            return
+
+        await event.message.respond(stats.format()[:2000])
+
+    async def handle_timings(self, event: hikari.GuildMessageCreateEvent) -> None:
+        guild = self.app.extensions.get("clend.guild")
+        if guild is None:
+            await event.message.respond("`clend.guild` not loaded")
+            return
+
+        instruments = guild.instruments
+        text = instruments.prometheus()
+        if event.content and event.content.endswith("-reset"):
+            instruments.reset()
+        await event.message.respond(
+            attachment=hikari.Bytes(text.encode(), "timings.txt")
+        )
+
     async def handle_eval(self, event: hikari.MessageCreateEvent) -> None:
         assert event.content
         content = event.content[11:]
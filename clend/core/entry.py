@@ -28,6 +28,7 @@ EXTENSIONS = [
     "clend.traffic",
     "clend.integrations",
     "clend.backup",
+    "clend.stats",
 ]
 
 
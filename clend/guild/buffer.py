@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import collections
+import time
+import typing
+
+import hikari
+
+from ..shared.custom_events import FastTimerEvent, SlowTimerEvent
+
+# messages and joins are what the components need to catch raids that started
+# while the settings were still loading, everything else gets a small buffer
+PRIORITY_EVENTS = (
+    hikari.GuildMessageCreateEvent,
+    hikari.GuildMessageUpdateEvent,
+    hikari.MemberCreateEvent,
+    hikari.MemberUpdateEvent,
+)
+# timers fire again anyway, replaying stale ones would only skew the counters
+DISCARDED_EVENTS = (FastTimerEvent, SlowTimerEvent)
+PRIORITY_SIZE = 1000
+OTHER_SIZE = 100
+
+
+class EventBuffer:
+    priority: collections.deque[tuple[int, hikari.Event]]
+    other: collections.deque[tuple[int, hikari.Event]]
+
+    def __init__(
+        self, priority_size: int = PRIORITY_SIZE, other_size: int = OTHER_SIZE
+    ) -> None:
+        self.priority = collections.deque()
+        self.other = collections.deque()
+        self.priority_size = priority_size
+        self.other_size = other_size
+        self.sequence = 0
+
+        self.buffered = 0
+        self.dropped = 0
+        self.replayed = 0
+        self.discarded_timers = 0  # not counted as dropped, nothing is lost
+
+    def __len__(self) -> int:
+        return len(self.priority) + len(self.other)
+
+    def put(self, event: hikari.Event) -> None:
+        if isinstance(event, DISCARDED_EVENTS):
+            self.discarded_timers += 1
+            return
+
+        if isinstance(event, PRIORITY_EVENTS):
+            buffer, size = self.priority, self.priority_size
+        else:
+            buffer, size = self.other, self.other_size
+
+        if len(buffer) >= size:
+            # the oldest events are the least relevant ones
+            buffer.popleft()
+            self.dropped += 1
+
+        buffer.append((self.sequence, event))
+        self.sequence += 1
+        self.buffered += 1
+
+    def get(self) -> hikari.Event | None:
+        if self.priority and (not self.other or self.priority[0][0] < self.other[0][0]):
+            _, event = self.priority.popleft()
+        elif self.other:
+            _, event = self.other.popleft()
+        else:
+            return None
+
+        self.replayed += 1
+        return event
+
+    def replay(
+        self, callback: typing.Callable[[hikari.Event], None], budget: float
+    ) -> bool:
+        """
+        Replay buffered events in order until the time budget (in seconds) is used
+        up. Returns True once the buffer is empty.
+        """
+        deadline = time.monotonic() + budget
+        while (event := self.get()) is not None:
+            callback(event)
+            if time.monotonic() > deadline:
+                return not self
+        return True
@@ -4,7 +4,7 @@ import hikari
 from cleaner_i18n import Message
 
 from ...shared.event import ILog
-from ...shared.risk import calculate_risk_score
+from ...shared.risk import risk_score
 from ..guild import CleanerGuild
 
 
@@ -20,7 +20,7 @@ def on_member_create(
         return None
     age = event.member.joined_at - event.member.created_at
     hours = age.total_seconds() // 3600
-    risk = calculate_risk_score(event.user)
+    risk = risk_score(event.user)
 
     return (
         ILog(
@@ -2,8 +2,8 @@ import statistics
 import typing
 
 import hikari
-from cleaner_data.normalize import normalize
 
+from ....shared.features import normalized
 from ...guild import CleanerGuild
 
 MIN_DATA = 10
@@ -16,7 +16,7 @@ class TokenMessageMitigation(typing.NamedTuple):
 def match(mitigation: TokenMessageMitigation, message: hikari.Message) -> bool:
     if not message.content:
         return False
-    all_tokens = set(normalize(message.content, remove_urls=False).split())
+    all_tokens = set(normalized(message.content, False).split())
     return all_tokens & mitigation.tokens == mitigation.tokens
 
 
@@ -33,7 +33,7 @@ def detection(
         set() if data is None else set(map(int, data.config.slowmode_exceptions))
     )
 
-    all_tokens = set(normalize(message.content, remove_urls=False).split())
+    all_tokens = set(normalized(message.content, False).split())
     if not all_tokens:
         return None
     scores = []
@@ -41,7 +41,7 @@ def detection(
         if not old_message.content:
             continue
         is_exception = old_message.channel_id in slowmode_exceptions
-        tokens = set(normalize(old_message.content, remove_urls=False).split())
+        tokens = set(normalized(old_message.content, False).split())
         score = len(all_tokens & tokens) / len(all_tokens)
         scores.append((score, tokens, 0.1 if is_exception else 1))
 
@@ -1,26 +1,20 @@
-import re
-
-import emoji  # type: ignore
 import hikari
-from cleaner_data.url import get_urls
 
+from ....shared.emojis import count_emojis
+from ....shared.features import urls
 from ...guild import CleanerGuild
 from ...helper import is_exception
 
-emoji_regex = re.compile(r"(<a?:[^\s:]+:\d+>)|(:[^\s:]+:)")
+EMOJI_THRESHOLD = 7
 
 
 def emoji_mass(message: hikari.PartialMessage, guild: CleanerGuild) -> bool:
     if not message.content or is_exception(guild, message.channel_id):
         return False
-    content = emoji.demojize(message.content)
-    emojis = emoji_regex.findall(content)
-    return len(emojis) >= 7
+    return count_emojis(message.content, EMOJI_THRESHOLD) >= EMOJI_THRESHOLD
 
 
 def selfbot_embed(message: hikari.PartialMessage, guild: CleanerGuild) -> bool:
     if not message.content or not message.embeds:
         return False
-    for _ in get_urls(message.content):
-        return False
-    return True
+    return not urls(message.content)
@@ -3,9 +3,10 @@ from cleaner_data.auto.phishing_embed_thumbnail import data as banned_thumbnails
 from cleaner_data.domains import is_domain_blacklisted, is_domain_whitelisted
 from cleaner_data.normalize import normalize
 from cleaner_data.phishing_content import get_highest_phishing_match
-from cleaner_data.url import get_urls, has_url
+from cleaner_data.url import has_url
 from Levenshtein import ratio  # type: ignore
 
+from ....shared.features import urls
 from ...guild import CleanerGuild
 
 banned_descriptions = {
@@ -26,7 +27,7 @@ def phishing_domain_blacklisted(
 ) -> bool:
     if not message.content or not has_url(message.content):
         return False
-    for url in get_urls(message.content):
+    for url in urls(message.content):
         hostname = url.split("/")[2]
         if is_domain_blacklisted(hostname):
             return True
@@ -48,7 +49,7 @@ def phishing_domain_heuristic(
 ) -> bool:
     if not message.content or not has_url(message.content):
         return False
-    for url in get_urls(message.content):
+    for url in urls(message.content):
         hostname = url.split("/")[2]
         if is_domain_whitelisted(hostname):
             continue
@@ -1,24 +1,11 @@
 import hikari
 
+from ....shared.markdown import find_unescaped
 from ...guild import CleanerGuild
 
 
 def has_unescaped(content: str, key: str) -> bool:
-    current_position: int | None = None
-    while current_position is None or current_position < len(content):
-        try:
-            current_position = content.index(
-                key, None if current_position is None else current_position + 1
-            )
-        except ValueError:
-            break
-        before, after = content[:current_position], content[current_position:]
-        if before.count("`") % 2 == 0:
-            return True
-        elif after.count("`") == 0:
-            return True
-
-    return False
+    return find_unescaped(content, key) is not None
 
 
 def ping_users_many(message: hikari.PartialMessage, guild: CleanerGuild) -> bool:
@@ -45,9 +32,7 @@ def ping_roles(message: hikari.PartialMessage, guild: CleanerGuild) -> bool:
 def ping_broad(message: hikari.PartialMessage, guild: CleanerGuild) -> bool:
     if not message.content or message.mentions_everyone:
         return False
-    return has_unescaped(message.content, "@everyone") or has_unescaped(
-        message.content, "@here"
-    )
+    return find_unescaped(message.content, "@everyone", "@here") is not None
 
 
 def ping_hidden(message: hikari.PartialMessage, guild: CleanerGuild) -> bool:
@@ -1,47 +1,26 @@
-import time
-
-import hikari
 from cleaner_i18n import Message
 
-from ...shared.custom_events import FastTimerEvent
+from ...shared.custom_events import VerificationDueEvent
 from ...shared.event import IActionChallenge
 from ..guild import CleanerGuild
 from ..helper import action_challenge
 
 
-def on_member_create(event: hikari.MemberCreateEvent, guild: CleanerGuild) -> None:
-    guild.verification_joins[event.user_id] = time.monotonic()
-
-
-def on_member_delete(event: hikari.MemberDeleteEvent, guild: CleanerGuild) -> None:
-    if event.user_id in guild.verification_joins:
-        del guild.verification_joins[event.user_id]
-
-
-def on_fast_timer(
-    event: FastTimerEvent, cguild: CleanerGuild
+def on_verification_due(
+    event: VerificationDueEvent, cguild: CleanerGuild
 ) -> list[IActionChallenge] | None:
     data = cguild.get_data()
-    if (
-        data is None
-        or not data.config.verification_enabled
-        or not cguild.verification_joins
-    ):
+    if data is None or not data.config.verification_enabled:
         return None
     guild = event.app.cache.get_guild(cguild.id)
     if guild is None:
         return None
 
-    now = time.monotonic()
     actions = []
 
     info = {"name": "verification", "action": "kick"}
 
-    for user_id, expire in tuple(cguild.verification_joins.items()):
-        if now < expire + 8 * 60:
-            continue
-        del cguild.verification_joins[user_id]
-
+    for user_id in event.user_ids:
         member = guild.get_member(user_id)
         # > 1 because everyone role
         if member is None or len(member.role_ids) > 1:
@@ -63,7 +42,5 @@ def on_fast_timer(
 
 
 listeners = [
-    (hikari.MemberCreateEvent, on_member_create),
-    (hikari.MemberDeleteEvent, on_member_delete),
-    (FastTimerEvent, on_fast_timer),
+    (VerificationDueEvent, on_verification_due),
 ]
@@ -3,16 +3,22 @@ from __future__ import annotations
 import logging
 import queue
 import threading
+import time
 import typing
 
 import hikari
 
 from ..app import TheCleanerApp
 from ..shared.event import IAction, IGuildSettingsAvailable
-from ..shared.timing import Timed
+from ..shared.instrument import Instruments, Recorder
 from .guild import CleanerGuild
 
 WORKERS = 4
+# time budget for replaying buffered events before yielding to other guilds
+REPLAY_BUDGET = 0.01
+# record every nth run into the histograms, slow runs are always reported
+SAMPLE_EVERY = 1
+REPORT_THRESHOLD = 0.01
 ComponentListener = typing.Callable[[hikari.Event, CleanerGuild], list[IAction] | None]
 logger = logging.getLogger(__name__)
 
@@ -20,6 +26,7 @@ logger = logging.getLogger(__name__)
 class GuildExtension:
     guilds: dict[int, CleanerGuild]
     callbacks: dict[typing.Type[hikari.Event], list[ComponentListener]]
+    callback_ids: dict[typing.Type[hikari.Event], tuple[int, ...]]
     workers: list[GuildWorker] | None = None
     listeners: list[tuple[typing.Type[hikari.Event], typing.Any]]
 
@@ -38,6 +45,14 @@ class GuildExtension:
                     self.listeners.append((type, self.dispatch))
                 self.callbacks[type].append(func)
 
+        self.instruments = Instruments(
+            "clend_guild_callback", SAMPLE_EVERY, REPORT_THRESHOLD
+        )
+        self.callback_ids = {
+            type: tuple(self.instruments.register(func) for func in funcs)
+            for type, funcs in self.callbacks.items()
+        }
+
     def on_load(self) -> None:
         self.workers = [GuildWorker(self, idx, WORKERS) for idx in range(WORKERS)]
         for worker in self.workers:
@@ -76,6 +91,23 @@ class GuildExtension:
     async def dispatch(self, event: hikari.Event) -> None:
         self.send_event(event)
 
+    def event_buffer_stats(self) -> dict[str, int]:
+        stats = {
+            "pending": 0,
+            "buffered": 0,
+            "dropped": 0,
+            "replayed": 0,
+            "discarded_timers": 0,
+        }
+        for guild in tuple(self.guilds.values()):
+            buffer = guild.event_buffer
+            stats["pending"] += len(buffer)
+            stats["buffered"] += buffer.buffered
+            stats["dropped"] += buffer.dropped
+            stats["replayed"] += buffer.replayed
+            stats["discarded_timers"] += buffer.discarded_timers
+        return stats
+
 
 class GuildWorker:
     queue: queue.Queue[hikari.Event | None]
@@ -89,6 +121,7 @@ class GuildWorker:
         self.queue = queue.Queue()
         self.worker_index = worker_index
         self.worker_count = worker_count
+        self.recorder: Recorder = ext.instruments.recorder()
 
     def run(self) -> None:
         while True:
@@ -115,12 +148,15 @@ class GuildWorker:
                 guild.settings_loaded = True
 
         if isinstance(event, IGuildSettingsAvailable):
-            while not guild.event_queue.empty():
-                event = guild.event_queue.get_nowait()
-                self.event(event, guild)
-            guild.settings_loaded = True
+            if guild.event_buffer.replay(
+                lambda buffered: self.event(buffered, guild), REPLAY_BUDGET
+            ):
+                guild.settings_loaded = True
+            else:
+                # continue later so other guilds of this worker are not blocked
+                self.queue.put(event)
         elif not guild.settings_loaded:
-            guild.event_queue.put(event)
+            guild.event_buffer.put(event)
         else:
             self.event(event, guild)
 
@@ -128,18 +164,26 @@ class GuildWorker:
         callbacks = self.ext.callbacks.get(type(event), None)
         if callbacks is None:
             return
+        recorder = self.recorder
+        durations = recorder.durations
         data = None
-        with Timed(
-            name=f"running callbacks for {event.__class__.__name__} ({guild.id})",
-            report_threshold=0.01,
-        ) as timed:
-            for func in callbacks:
-                data = func(event, guild)
-                timed.checkpoint(f"{func.__module__}.{func.__qualname__}")
-                if data is not None:
-                    break
-            else:
-                return
+        ran = 0
+        start = last = time.perf_counter()
+        for func in callbacks:
+            data = func(event, guild)
+            now = time.perf_counter()
+            durations[ran] = now - last
+            last = now
+            ran += 1
+            if data is not None:
+                break
+
+        guild.busy_time += last - start
+        guild.event_count += 1
+        ids = self.ext.callback_ids[type(event)]
+        if recorder.record(ids, ran, last - start):
+            name = f"running callbacks for {event.__class__.__name__} ({guild.id})"
+            recorder.report(name, ids, ran, last - start)
 
         if data:
             self.ext.app.store.put_http(*data, thread_safe=True)
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import logging
-import queue
 import time
 import typing
 
@@ -11,12 +10,13 @@ from expirepy import ExpiringList, ExpiringSet
 
 from ..app import TheCleanerApp
 from ..shared.data import GuildData
+from .buffer import EventBuffer
 
 logger = logging.getLogger(__name__)
 
 
 class CleanerGuild:
-    event_queue: queue.Queue[hikari.Event]
+    event_buffer: EventBuffer
     worker: tuple[lupa.LuaRuntime, typing.Any] | None
     worker_spec: typing.Any
 
@@ -27,7 +27,6 @@ class CleanerGuild:
     member_joins: ExpiringSet[hikari.Snowflake]
     member_kicks: ExpiringSet[hikari.Snowflake]
     active_mitigations: list[typing.Any]
-    verification_joins: dict[int, float]
 
     def __init__(self, guild_id: int, app: TheCleanerApp) -> None:
         self.id = guild_id
@@ -35,10 +34,14 @@ class CleanerGuild:
 
         # config and entitlements arent available immediately
         self.settings_loaded = False
-        self.event_queue = queue.Queue()
+        self.event_buffer = EventBuffer()
         self.worker = None
         self.worker_spec = None
 
+        # time spent in component callbacks, read by clend.stats
+        self.busy_time = 0.0
+        self.event_count = 0
+
         # cache and stuff
         self.messages = ExpiringList(expires=30)
         self.message_count = {}
@@ -47,7 +50,6 @@ class CleanerGuild:
         self.member_joins = ExpiringSet(expires=300)
         self.member_kicks = ExpiringSet(expires=300)
         self.active_mitigations = []
-        self.verification_joins = {}  # no cache evict needed
 
     def evict_cache(self) -> None:
         self.messages.evict()
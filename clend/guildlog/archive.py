@@ -0,0 +1,147 @@
+"""
+Sealed guild log archives.
+
+A finished month of logs is stored as zlib compressed blocks of whole log
+entries, followed by an index with the time range of each block:
+
+    block ... block | msgpack index | index offset (u64) | MAGIC
+
+Range reads only decompress the blocks overlapping the requested range.
+"""
+
+import os
+import re
+import struct
+import typing
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+import msgpack  # type: ignore
+
+MAGIC = b"CLA1"
+FOOTER = struct.Struct("<Q4s")
+BLOCK_SIZE = 64 * 1024  # uncompressed
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+timestamp_regex = re.compile(r"\[(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)\] ")
+
+
+class Block(typing.NamedTuple):
+    # timestamps are kept as text, the format sorts like the time it represents.
+    # logs are queued from several places, so entries are only roughly in order
+    earliest: str
+    latest: str
+    offset: int
+    size: int
+
+
+def entries(lines: typing.Iterable[str]) -> typing.Iterator[tuple[str, str]]:
+    """Timestamp and text of every log entry, including its continuation lines."""
+    current_timestamp = ""
+    current: list[str] = []
+    for line in lines:
+        match = timestamp_regex.match(line)
+        if match is not None:
+            if current:
+                yield current_timestamp, "".join(current)
+                current = []
+            current_timestamp = match.group(1)
+        current.append(line)
+    if current:
+        yield current_timestamp, "".join(current)
+
+
+def seal(path: Path) -> Path:
+    """
+    Compress a finished month of logs. The plain log is kept, it is still what
+    gets read outside of `read_logs`.
+    """
+    target = path.with_suffix(".archive")
+    partial = path.with_suffix(".partial")
+    index: list[Block] = []
+    with path.open() as source, partial.open("wb") as fp:
+        block: list[tuple[str, str]] = []
+        size = 0
+        for entry in entries(source):
+            block.append(entry)
+            size += len(entry[1])
+            if size >= BLOCK_SIZE:
+                index.append(write_block(fp, block))
+                block, size = [], 0
+        if block:
+            index.append(write_block(fp, block))
+
+        offset = fp.tell()
+        fp.write(msgpack.packb([tuple(x) for x in index]))
+        fp.write(FOOTER.pack(offset, MAGIC))
+        fp.flush()
+        os.fsync(fp.fileno())
+
+    partial.rename(target)
+    return target
+
+
+def write_block(fp: typing.BinaryIO, block: list[tuple[str, str]]) -> Block:
+    data = zlib.compress("".join(text for _, text in block).encode(), 9)
+    offset = fp.tell()
+    fp.write(data)
+    timestamps = [timestamp for timestamp, _ in block]
+    return Block(min(timestamps), max(timestamps), offset, len(data))
+
+
+def read_index(fp: typing.BinaryIO) -> list[Block]:
+    end = fp.seek(-FOOTER.size, os.SEEK_END)
+    offset, magic = FOOTER.unpack(fp.read(FOOTER.size))
+    if magic != MAGIC:
+        raise ValueError(f"not a guild log archive: {fp.name!r}")
+    fp.seek(offset)
+    return [Block(*x) for x in msgpack.unpackb(fp.read(end - offset))]
+
+
+def read_archive(
+    path: Path, start: str | None = None, end: str | None = None
+) -> typing.Iterator[str]:
+    """Entries with `start <= timestamp < end`."""
+    with path.open("rb") as fp:
+        for block in read_index(fp):
+            if (start is not None and block.latest < start) or (
+                end is not None and block.earliest >= end
+            ):
+                continue
+            fp.seek(block.offset)
+            text = zlib.decompress(fp.read(block.size)).decode()
+            yield from select(entries(text.splitlines(True)), start, end)
+
+
+def read_plain(
+    path: Path, start: str | None = None, end: str | None = None
+) -> typing.Iterator[str]:
+    with path.open() as fp:
+        yield from select(entries(fp), start, end)
+
+
+def select(
+    items: typing.Iterable[tuple[str, str]], start: str | None, end: str | None
+) -> typing.Iterator[str]:
+    for timestamp, text in items:
+        if (start is None or timestamp >= start) and (end is None or timestamp < end):
+            yield text
+
+
+def months(start: datetime, end: datetime) -> typing.Iterator[str]:
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        yield f"{year:>04}-{month:>02}"
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def read_logs(directory: Path, start: datetime, end: datetime) -> typing.Iterator[str]:
+    """Log entries of a guild between `start` and `end` (exclusive)."""
+    first, last = start.strftime(TIMESTAMP_FORMAT), end.strftime(TIMESTAMP_FORMAT)
+    for month in months(start, end):
+        archive = directory / f"{month}.archive"
+        plain = directory / f"{month}.log"
+        if archive.exists():
+            yield from read_archive(archive, first, last)
+        elif plain.exists():  # the current month, or not sealed yet
+            yield from read_plain(plain, first, last)
@@ -0,0 +1,88 @@
+import logging
+import time
+import typing
+from collections import OrderedDict
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+PROTECTED_RATIO = 0.8
+
+
+@dataclass(slots=True)
+class OpenFileHandle:
+    file_handle: typing.TextIO
+    last_write: float
+
+
+class HandleCache:
+    """
+    Segmented LRU for open log files.
+
+    New handles start in the probation segment and move to the protected
+    segment on their second write, so a burst of guilds that log once can't
+    push out the guilds that log all the time. Both segments are ordered by
+    last write, which makes eviction and idle expiry O(1) per handle.
+    """
+
+    probation: OrderedDict[int, OpenFileHandle]
+    protected: OrderedDict[int, OpenFileHandle]
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = max(capacity, 1)
+        self.protected_capacity = int(self.capacity * PROTECTED_RATIO)
+        self.probation = OrderedDict()
+        self.protected = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.probation) + len(self.protected)
+
+    def __contains__(self, guild_id: int) -> bool:
+        return guild_id in self.protected or guild_id in self.probation
+
+    def get(self, guild_id: int) -> typing.TextIO | None:
+        """Handle of the guild, counted as a write."""
+        now = time.monotonic()
+        handle = self.protected.get(guild_id, None)
+        if handle is not None:
+            self.protected.move_to_end(guild_id)
+        else:
+            handle = self.probation.pop(guild_id, None)
+            if handle is None:
+                return None
+            self.protected[guild_id] = handle
+            if len(self.protected) > self.protected_capacity:
+                demoted_id, demoted = self.protected.popitem(last=False)
+                demoted.last_write = now  # gets another full period on probation
+                self.probation[demoted_id] = demoted
+
+        handle.last_write = now
+        return handle.file_handle
+
+    def add(self, guild_id: int, file_handle: typing.TextIO) -> None:
+        if len(self) >= self.capacity:
+            segment = self.probation or self.protected
+            evicted_id, evicted = segment.popitem(last=False)
+            logger.debug(f"evicted {evicted_id} file handle")
+            evicted.file_handle.close()
+        self.probation[guild_id] = OpenFileHandle(file_handle, time.monotonic())
+
+    def expire(self, idle: float) -> int:
+        """Close handles without a write in the last `idle` seconds."""
+        cutoff = time.monotonic() - idle
+        expired = 0
+        for segment in (self.probation, self.protected):
+            while segment:
+                guild_id, handle = next(iter(segment.items()))
+                if handle.last_write >= cutoff:
+                    break
+                del segment[guild_id]
+                logger.debug(f"evicted {guild_id} because of no writes")
+                handle.file_handle.close()
+                expired += 1
+        return expired
+
+    def close_all(self) -> None:
+        for segment in (self.probation, self.protected):
+            for handle in segment.values():
+                handle.file_handle.close()
+            segment.clear()
@@ -1,34 +1,33 @@
 import asyncio
 import logging
+import os
 import resource
+import time
 import typing
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from pathlib import Path
 
-import aiofiles
-import aiofiles.os
 import hikari
 
 from ..app import TheCleanerApp
 from ..shared.custom_events import SlowTimerEvent
 from ..shared.event import ILog
 from ..shared.protect import protect
+from . import archive
+from .cache import HandleCache
 
 logger = logging.getLogger(__name__)
 HANDLE_LIMIT = resource.getrlimit(resource.RLIMIT_NOFILE)[0]
-INITIAL_WRITES = 4
-
-
-@dataclass
-class OpenFileHandle:
-    file_handle: aiofiles.threadpool.text.AsyncTextIOWrapper
-    writes: int
+IDLE_TIMEOUT = 15 * 60  # handles without writes for this long are closed
+MAX_BATCH = 1000  # logs handed to the io thread at once
+SEAL_BUDGET = 5.0  # seconds spent sealing logs per slow timer tick
 
 
 class GuildLogExtension:
     listeners: list[tuple[typing.Type[hikari.Event], typing.Any]]
     queue: asyncio.Queue[ILog]
-    handles: dict[int, OpenFileHandle]
+    handles: HandleCache
     task: asyncio.Task[None] | None = None
 
     def __init__(self, app: TheCleanerApp) -> None:
@@ -36,58 +35,76 @@ class GuildLogExtension:
         self.listeners = [
             (SlowTimerEvent, self.on_slow_timer),
         ]
-        self.file_handle_limit = HANDLE_LIMIT // 4
-        self.handles = {}
+        self.handles = HandleCache(HANDLE_LIMIT // 4)
         self.queue = asyncio.Queue()
         self.now = datetime.utcnow()
+        # guild ids with an existing log directory
+        self.directories: set[int] = set()
+        # logs of finished months without an archive
+        self.unsealed: list[Path] = []
+        # handles and files are only touched on this thread
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix="guildlog")
 
     def on_load(self) -> None:
         self.task = asyncio.create_task(protect(self.logd))
+        # months that ended while the bot was offline
+        self.executor.submit(self.find_unsealed)
 
     def on_unload(self) -> None:
         if self.task is not None:
             self.task.cancel()
 
         # cleanup job
-        if self.handles:
-            asyncio.create_task(self.close_all_handles())
+        batch = self.take_batch()
+        if batch:
+            self.executor.submit(self.write_batch, batch)
+        self.executor.submit(self.close_all_handles)
+        self.executor.shutdown(wait=False)
 
     async def logd(self) -> None:
+        loop = asyncio.get_running_loop()
         while True:
             log = await self.queue.get()
-            handle = await self.get_handle(log.guild_id)
-            formatted_log = self.format_log(log)
-            await handle.write(formatted_log)
-
-    async def get_handle(
-        self, guild_id: int
-    ) -> aiofiles.threadpool.text.AsyncTextIOWrapper:
-        handle = self.handles.get(guild_id, None)
-        if handle is None:
-            if len(self.handles) >= self.file_handle_limit:
-                # reached the limit, kick the one with least writes out
-                least_guild_id = min(
-                    self.handles, key=lambda gid: self.handles[gid].writes
-                )
-                logger.debug(f"evicted {least_guild_id} file handle")
-                handle = self.handles[least_guild_id]
-                del self.handles[least_guild_id]
-                await handle.file_handle.close()
-
-            if not await aiofiles.os.path.exists(f"guild-log/{guild_id}"):
-                await aiofiles.os.makedirs(f"guild-log/{guild_id}")
+            # logs that arrive during the write are picked up by the next batch
+            batch = self.take_batch(log)
+            await loop.run_in_executor(self.executor, self.write_batch, batch)
+
+    def take_batch(self, log: ILog | None = None) -> dict[int, list[ILog]]:
+        batch: dict[int, list[ILog]] = {}
+        count = 0
+        if log is not None:
+            batch[log.guild_id] = [log]
+            count += 1
+        while count < MAX_BATCH and not self.queue.empty():
+            log = self.queue.get_nowait()
+            batch.setdefault(log.guild_id, []).append(log)
+            count += 1
+        return batch
+
+    def write_batch(self, batch: dict[int, list[ILog]]) -> None:
+        for guild_id, logs in batch.items():
+            try:
+                handle = self.get_handle(guild_id)
+                handle.writelines(map(self.format_log, logs))
+                handle.flush()
+            except OSError as e:
+                logger.exception(f"unable to write logs of {guild_id}", exc_info=e)
+
+    def get_handle(self, guild_id: int) -> typing.TextIO:
+        file_handle = self.handles.get(guild_id)
+        if file_handle is None:
+            if guild_id not in self.directories:
+                os.makedirs(f"guild-log/{guild_id}", exist_ok=True)
+                self.directories.add(guild_id)
 
             filename = (
                 f"guild-log/{guild_id}/{self.now.year:>04}-{self.now.month:>02}.log"
             )
             logger.debug(f"opened file: {filename!r} ({guild_id})")
-            file_handle = await aiofiles.open(filename, "a")
-            self.handles[guild_id] = handle = OpenFileHandle(
-                file_handle, INITIAL_WRITES
-            )
+            file_handle = open(filename, "a")
+            self.handles.add(guild_id, file_handle)
 
-        handle.writes += 1
-        return handle.file_handle
+        return file_handle
 
     def format_log(self, log: ILog, locale: str = "en-US") -> str:
         timestamp = log.created_at.strftime("%Y-%m-%d %H:%M:%S")
@@ -118,23 +135,56 @@ class GuildLogExtension:
         return "\n".join(lines) + "\n"
 
     async def on_slow_timer(self, event: SlowTimerEvent) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self.maintain_handles)
+
+        # one log per job, so the writes queued in between are not held up
+        deadline = time.monotonic() + SEAL_BUDGET
+        while self.unsealed and time.monotonic() < deadline:
+            path = self.unsealed.pop()
+            await loop.run_in_executor(self.executor, self.seal_log, path)
+
+    def maintain_handles(self) -> None:
         now = datetime.utcnow()
         if now.year > self.now.year or now.month > self.now.month:
-            # new month, reopen all handles
-            await self.close_all_handles()
+            # new month, reopen all handles and archive the old logs
+            self.close_all_handles()
             self.now = now
+            self.find_unsealed()
 
         else:
-            for guild_id, handle in tuple(self.handles.items()):
-                handle.writes //= 2
-                if handle.writes == 0:
-                    logger.debug(f"evicted {guild_id} because of no writes")
-                    del self.handles[guild_id]
-                    await handle.file_handle.close()
-
-    async def close_all_handles(self) -> None:
+            self.handles.expire(IDLE_TIMEOUT)
+
+    def find_unsealed(self) -> None:
+        current = f"{self.now.year:>04}-{self.now.month:>02}"
+        root = Path("guild-log")
+        sealed = {path.with_suffix(".log") for path in root.glob("*/*.archive")}
+        self.unsealed = [
+            path
+            for path in root.glob("*/*.log")
+            if path.stem < current and path not in sealed
+        ]
+        if self.unsealed:
+            logger.info(f"{len(self.unsealed)} guild logs to seal")
+
+    def seal_log(self, path: Path) -> None:
+        try:
+            archive.seal(path)
+        except (OSError, ValueError) as e:
+            logger.exception(f"unable to seal {path}", exc_info=e)
+
+    async def read_logs(
+        self, guild_id: int, start: datetime, end: datetime
+    ) -> list[str]:
+        """Log entries between `start` and `end` (exclusive), both in UTC."""
+        loop = asyncio.get_running_loop()
+        # on the io thread so it sees all logs that have been written
+        return await loop.run_in_executor(
+            self.executor,
+            lambda: list(archive.read_logs(Path(f"guild-log/{guild_id}"), start, end)),
+        )
+
+    def close_all_handles(self) -> None:
         logger.info("closing all file handles")
-        futures = [handle.file_handle.close() for handle in self.handles.values()]
-        self.handles.clear()
-        await asyncio.gather(*futures)
+        self.handles.close_all()
         logger.info("all file handles closed")
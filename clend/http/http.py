@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import asyncio
+import collections
 import logging
 import random
+import time
 import typing
 from datetime import datetime, timedelta
 
@@ -23,6 +25,7 @@ from ..shared.event import (
     IGuildEvent,
     ILog,
 )
+from ..shared.instrument import Histogram
 from ..shared.protect import protected_call
 from .likely_phishing import is_likely_phishing, report_phishing
 
@@ -59,6 +62,8 @@ class HTTPService:
     challenged_users: ExpiringSet[str]
     deleted_messages: ExpiringSet[int]
     bulk_delete_cooldown: ExpiringSet[int]
+    completed: collections.Counter[str]
+    timings: dict[str, Histogram]
 
     def __init__(self, app: TheCleanerApp) -> None:
         self.app = app
@@ -73,24 +78,37 @@ class HTTPService:
         self.deleted_messages = ExpiringSet(expires=60)
         self.bulk_delete_cooldown = ExpiringSet(expires=3)
 
+        self.completed = collections.Counter()
+        self.timings = collections.defaultdict(Histogram)
+
     async def ind(self) -> None:
         while True:
             ev: IGuildEvent = await self.main_queue.async_q.get()
             if isinstance(ev, IActionChallenge):
-                asyncio.create_task(protected_call(self.handle_action_challenge(ev)))
+                asyncio.create_task(
+                    self.tracked("challenge", self.handle_action_challenge(ev))
+                )
 
             elif isinstance(ev, IActionDelete):
-                asyncio.create_task(protected_call(self.handle_action_delete(ev)))
+                asyncio.create_task(
+                    self.tracked("delete", self.handle_action_delete(ev))
+                )
 
             elif isinstance(ev, IActionNickname):
-                asyncio.create_task(protected_call(self.handle_action_nickname(ev)))
+                asyncio.create_task(
+                    self.tracked("nickname", self.handle_action_nickname(ev))
+                )
 
             elif isinstance(ev, IActionAnnouncement):
-                asyncio.create_task(protected_call(self.handle_action_announcement(ev)))
+                asyncio.create_task(
+                    self.tracked("announcement", self.handle_action_announcement(ev))
+                )
 
             elif isinstance(ev, IActionChannelRatelimit):
                 asyncio.create_task(
-                    protected_call(self.handle_action_channelratelimit(ev))
+                    self.tracked(
+                        "channelratelimit", self.handle_action_channelratelimit(ev)
+                    )
                 )
 
             elif isinstance(ev, ILog):
@@ -99,6 +117,14 @@ class HTTPService:
             else:
                 logger.warning(f"unexpected event received: {ev}")
 
+    async def tracked(
+        self, name: str, coro: typing.Coroutine[None, None, None]
+    ) -> None:
+        start = time.perf_counter()
+        await protected_call(coro)
+        self.timings[name].record(time.perf_counter() - start)
+        self.completed[name] += 1
+
     async def handle_action_challenge(self, ev: IActionChallenge) -> None:
         if f"{ev.guild_id}-{ev.user.id}" in self.challenged_users:
             return
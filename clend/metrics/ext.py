@@ -1,24 +1,31 @@
 import asyncio
-import copy
+import hashlib
 import logging
 import time
 import typing
+from datetime import date, datetime, timedelta
 
 import hikari
 import msgpack  # type: ignore
 
 from ..app import TheCleanerApp
 from ..shared.protect import protect
-from .metrics import Metrics, metrics_reader
+from .metrics import LEGACY, Metrics
 from .types import ResultDict
 
 logger = logging.getLogger(__name__)
+# segments older than that only need per day counts
+ROLLUP_AFTER = timedelta(days=60)
+PUBLISH_CHUNK_SIZE = 1000
+FLUSH_INTERVAL = 1  # seconds
 
 
 class MetricsExtension:
     queue: asyncio.Queue[typing.Any]
     listeners: list[tuple[typing.Type[hikari.Event], typing.Any]]
     metrics: Metrics
+    radar_digests: dict[int, bytes]
+    snapshot: dict[date, int]
     task: asyncio.Task[None] | None = None
 
     def __init__(self, app: TheCleanerApp) -> None:
@@ -29,8 +36,14 @@ class MetricsExtension:
         ]
         self.queue = asyncio.Queue()
         self.metrics = Metrics()
+        self.radar_digests = {}
+        self.last_publish_duration = 0.0
+        self.last_publish_count = 0
 
     def on_load(self) -> None:
+        # new events are counted right away, the history that was on disk before
+        # this point is loaded in the background, also when maind is restarted
+        self.snapshot = self.metrics.store.snapshot()
         self.task = asyncio.create_task(protect(self.maind))
 
     def on_unload(self) -> None:
@@ -41,187 +54,113 @@ class MetricsExtension:
         self.metrics.close()
 
     async def on_destroy_guild(self, event: hikari.GuildLeaveEvent) -> None:
+        self.radar_digests.pop(event.guild_id, None)
         database = self.app.database
         await database.delete((f"guild:{event.guild_id}:radar",))
 
     async def maind(self) -> None:
         loop = asyncio.get_running_loop()
 
-        if not self.metrics.history:
-            temp_storage = []
-            loading = loop.run_in_executor(None, self.load_metrics)
-            while not loading.done():
-                temp_storage.append(await self.queue.get())
-            logger.info("all metrics loaded")
+        loaded = self.metrics.radar_loaded
+        loading = None
+        if not loaded:
+            loading = loop.run_in_executor(None, self.load_metrics, self.snapshot)
 
-            for event in temp_storage:
+        last_flush = time.monotonic()
+        last_update = float("-inf")  # publish as soon as the history is loaded
+        while True:
+            try:
+                event = await asyncio.wait_for(self.queue.get(), FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            else:
                 logger.debug(event)
                 self.metrics.log(event)
 
-        last_update = None
-        while True:
             now = time.monotonic()
-            if last_update is None or now - last_update > 300:
-                logger.debug("updating radar")
+            if now - last_flush > FLUSH_INTERVAL:
                 await loop.run_in_executor(None, self.metrics.flush)
-                data, guilds = await loop.run_in_executor(None, self.gather_radar_data)
-                await self.app.database.set("radar", data)
-                for guild_id, guild_data in guilds.items():
-                    await self.app.database.set(f"guild:{guild_id}:radar", guild_data)
-                last_update = now
-                logger.debug("radar updated")
-
-            event = await self.queue.get()
-            logger.debug(event)
-            self.metrics.log(event)
-
-    def load_metrics(self) -> None:
-        logger.debug("loading metrics.bin")
-        self.metrics.history = list(metrics_reader())
-        logger.debug("loaded metrics.bin")
+                last_flush = now
+
+            if not loaded:
+                assert loading is not None
+                if not loading.done():
+                    continue
+                loading.result()
+                loaded = True
+                logger.info("all metrics loaded")
+            elif now - last_update <= 300:
+                continue
+
+            logger.debug("updating radar")
+            await loop.run_in_executor(None, self.rollup_metrics)
+            data, guilds = await loop.run_in_executor(None, self.gather_radar_data)
+            changed = await loop.run_in_executor(None, self.changed_radars, guilds)
+            await self.publish_radar(data, changed)
+            last_update = now
+            logger.debug("radar updated")
+
+    def load_metrics(self, snapshot: dict[date, int]) -> None:
+        if LEGACY.exists():
+            logger.debug("importing metrics.bin")
+            imported = self.metrics.import_legacy(count=True)
+            logger.debug(f"imported {imported} metrics from metrics.bin")
+
+        logger.debug("loading radar from metrics")
+        loaded = self.metrics.load_radar(snapshot)
+        logger.debug(f"loaded radar from {loaded} metrics")
+
+    def rollup_metrics(self) -> None:
+        rolled_up = self.metrics.store.rollup(datetime.utcnow().date() - ROLLUP_AFTER)
+        if rolled_up:
+            logger.info(f"rolled up {rolled_up} metrics segments")
 
     def gather_radar_data(self) -> tuple[bytes, dict[int, bytes]]:
-        phishing_rules = (
-            "phishing.content",
-            "phishing.domain.blacklisted",
-            "phishing.domain.heuristic",
-            "phishing.embed",
-        )
-        ping = (
-            "ping.users.many",
-            "ping.users.few",
-            "ping.roles",
-            "ping.broad",
-            "ping.hidden",
-        )
-        advertisement = ("advertisement.discord.invite",)
-        other = ("selfbot.embed", "emoji.mass", "worker")
-        all_rules = phishing_rules + ping + advertisement + other
-
-        traffic = (
-            "traffic.similar",
-            "traffic.exact",
-            "traffic.token",
-            "traffic.sticker",
-            "traffic.attachment",
-        )
-
-        challenge_actions = ("ban", "kick", "role", "timeout", "failure")
-        categories = (
-            "phishing",
-            "antispam",
-            "advertisement",
-            "other",
-            "dehoist",
-            "antiraid",
-            "impersonation_discord",
-        )
-
-        timespan = 60 * 60 * 24 * 30
-        latest = self.metrics.history[-1][0]
-        cutoff_now = latest - timespan
-        cutoff_previous = latest - timespan * 2
+        radar = self.metrics.radar
+        radar.advance()
 
         result: ResultDict = {
-            "rules": {r: {"total": 0, "previous": 0, "now": 0} for r in all_rules},
-            "traffic": {t: {"total": 0, "previous": 0, "now": 0} for t in traffic},
-            "categories": {
-                c: {"total": 0, "previous": 0, "now": 0} for c in categories
-            },
-            "challenges": {
-                c: {"total": 0, "previous": 0, "now": 0} for c in challenge_actions
-            },
+            **radar.radar(),  # type: ignore
             "stats": {
                 "guild_count": len(self.app.bot.cache.get_guilds_view()),
                 "user_count": self.app.store.get_user_count(),
             },
         }
-        guild_template = {
-            "rules": {r: {"total": 0, "previous": 0, "now": 0} for r in all_rules},
-            "traffic": {t: {"total": 0, "previous": 0, "now": 0} for t in traffic},
-            "categories": {
-                c: {"total": 0, "previous": 0, "now": 0} for c in categories
-            },
-            "challenges": {
-                c: {"total": 0, "previous": 0, "now": 0} for c in challenge_actions
-            },
-        }
-        guilds = {}
-
-        for timestamp, data in self.metrics.history:
-            if data["guild"] not in guilds:
-                guilds[data["guild"]] = copy.deepcopy(guild_template)
-            span: typing.Literal["now", "previous"] | None = (
-                None
-                if cutoff_previous > timestamp
-                else "previous"
-                if cutoff_now > timestamp
-                else "now"
-            )
-            guild = guilds[data["guild"]]
-            if data["name"] == "challenge":
-                result["challenges"][data["action"]]["total"] += 1
-                guild["challenges"][data["action"]]["total"] += 1
-                if span is not None:
-                    result["challenges"][data["action"]][span] += 1
-                    guild["challenges"][data["action"]][span] += 1
-
-                name = data["info"].get("name")
-                category = ""
-                if name == "antiraid_limit":
-                    category = "antiraid"
-                elif name == "impersonation_discord":
-                    category = "impersonation_discord"
-
-                if category:
-                    result["categories"][category]["total"] += 1
-                    guild["categories"][category]["total"] += 1
-                    if span is not None:
-                        result["categories"][category][span] += 1
-                        guild["categories"][category][span] += 1
-
-            elif data["name"] == "delete":
-                rule = data["info"]["rule"]
-                delete_category = None
-                if rule in all_rules:
-                    result["rules"][rule]["total"] += 1
-                    guild["rules"][rule]["total"] += 1
-                    if span is not None:
-                        result["rules"][rule][span] += 1
-                        guild["rules"][rule][span] += 1
-                    if rule in phishing_rules:
-                        delete_category = "phishing"
-                    elif rule in advertisement:
-                        delete_category = "advertisement"
-                    else:
-                        delete_category = "other"
-                elif rule in traffic:
-                    result["traffic"][rule]["total"] += 1
-                    guild["traffic"][rule]["total"] += 1
-                    if span is not None:
-                        result["traffic"][rule][span] += 1
-                        guild["traffic"][rule][span] += 1
-                    delete_category = "antispam"
-                else:
-                    logger.warning(f"unknown rule: {rule}")
-
-                if delete_category is not None:
-                    result["categories"][delete_category]["total"] += 1
-                    guild["categories"][delete_category]["total"] += 1
-                    if span is not None:
-                        result["categories"][delete_category][span] += 1
-                        guild["categories"][delete_category][span] += 1
-
-            elif data["name"] == "nickname":
-                if data["action"] in ("reset_success", "success"):
-                    category = data["info"]["name"]
-                    result["categories"][category]["total"] += 1
-                    guild["categories"][category]["total"] += 1
-                    if span is not None:
-                        result["categories"][category][span] += 1
-                        guild["categories"][category][span] += 1
 
         return msgpack.packb(result), {
-            guild_id: msgpack.packb(guild_data)
-            for guild_id, guild_data in guilds.items()
+            guild_id: msgpack.packb(radar.radar(guild_id))
+            for guild_id in radar.guilds()
         }
+
+    def changed_radars(
+        self, guilds: dict[int, bytes]
+    ) -> dict[int, tuple[bytes, bytes]]:
+        changed = {}
+        for guild_id, guild_data in guilds.items():
+            digest = hashlib.blake2b(guild_data, digest_size=16).digest()
+            if self.radar_digests.get(guild_id, None) != digest:
+                changed[guild_id] = (guild_data, digest)
+        return changed
+
+    async def publish_radar(
+        self, data: bytes, guilds: dict[int, tuple[bytes, bytes]]
+    ) -> None:
+        start = time.monotonic()
+        database = self.app.database
+        await database.set("radar", data)
+
+        guild_ids = tuple(guilds)
+        for index in range(0, len(guild_ids), PUBLISH_CHUNK_SIZE):
+            chunk = guild_ids[index : index + PUBLISH_CHUNK_SIZE]
+            await database.mset(
+                {f"guild:{guild_id}:radar": guilds[guild_id][0] for guild_id in chunk}
+            )
+            for guild_id in chunk:
+                self.radar_digests[guild_id] = guilds[guild_id][1]
+
+        self.last_publish_duration = time.monotonic() - start
+        self.last_publish_count = len(guild_ids)
+        logger.debug(
+            f"published radar of {len(guild_ids)} guilds "
+            f"in {self.last_publish_duration * 1000:.3f}ms"
+        )
@@ -1,68 +1,121 @@
+import logging
+import threading
 import typing
-from datetime import datetime
-from io import BufferedWriter
+from datetime import date, datetime
 from pathlib import Path
 
 import msgpack  # type: ignore
 
-DEFAULT = Path("metrics.bin")
+from .radar import RadarRollup
+from .store import MetricsStore, Row
+
+logger = logging.getLogger(__name__)
+LEGACY = Path("metrics.bin")
+LEGACY_CHUNK_SIZE = 1 << 20
+LEGACY_BATCH_SIZE = 10_000
 Item = dict[str, typing.Any]
 
 
-def set_encoder(obj: typing.Any) -> typing.Any:
-    if isinstance(obj, set):
-        return tuple(obj)
-    return obj
+def to_row(timestamp: float, item: Item) -> Row:
+    info = item.get("info", None) or {}
+    # deletions are attributed to a rule, everything else to a detection name
+    rule = info.get("rule" if item["name"] == "delete" else "name", None)
+    return Row(
+        timestamp,
+        int(item["guild"]),
+        item["name"],
+        item.get("action", None) or "",
+        rule if isinstance(rule, str) else "",
+    )
 
 
 class Metrics:
-    history: list[tuple[float, Item]]
-    _entries: list[bytes]
-    _file: BufferedWriter | None = None
+    _pending: list[Row]
 
     def __init__(self, path: Path | None = None) -> None:
-        if path is None:
-            path = DEFAULT
-        self.path = path
-        self.history = []
-        self._entries = []
-
-    def _open(self) -> None:
-        if self._file is None:
-            if not self.path.parent.exists():
-                self.path.parent.mkdir(parents=True)
-            self._file = self.path.open("ab")
+        self.store = MetricsStore(path)
+        self.radar = RadarRollup()
+        self.radar_loaded = False
+        self._pending = []
+        # log runs on the event loop, flush in an executor
+        self._pending_lock = threading.Lock()
 
     def close(self) -> None:
-        if self._file is not None:
-            self._file.close()
+        self.store.close()
 
     def __del__(self) -> None:
         self.flush()
         self.close()
 
     def log(self, info: Item) -> None:
-        payload = (datetime.utcnow().timestamp(), info)
-        self.history.append(payload)
-        self._entries.append(msgpack.packb(payload, default=set_encoder))
+        row = to_row(datetime.utcnow().timestamp(), info)
+        with self._pending_lock:
+            self._pending.append(row)
+        self.radar.add(row)
 
     def flush(self) -> None:
-        if self._entries:
-            if self._file is None:
-                self._open()
-            assert self._file, "impossible"
-            while self._entries:
-                self._file.write(self._entries.pop(0))
-            self._file.flush()
+        with self._pending_lock:
+            rows, self._pending = self._pending, []
+        if rows:
+            self.store.append(rows)
+
+    def rows(self, since: date | None = None) -> typing.Iterator[Row]:
+        return self.store.read(since)
+
+    def load_radar(self, snapshot: dict[date, int] | None = None) -> int:
+        """
+        Count the stored history into the radar, only once. Rows appended after
+        `snapshot` was taken are skipped, those were already counted by `log`.
+        """
+        if self.radar_loaded:
+            return 0
+        # counted apart and merged at the end, a failed load leaves no trace
+        history = RadarRollup(self.radar.today)
+        loaded = 0
+        for row in self.store.read(snapshot=snapshot):
+            history.add(row)
+            loaded += 1
+        self.radar.merge(history)
+        self.radar_loaded = True
+        return loaded
+
+    def import_legacy(self, path: Path | None = None, count: bool = False) -> int:
+        if path is None:
+            path = LEGACY
+        imported = 0
+        history = RadarRollup(self.radar.today) if count else None
+        batch = []
+        for timestamp, item in metrics_reader(path):
+            batch.append(to_row(timestamp, item))
+            if len(batch) >= LEGACY_BATCH_SIZE:
+                self.import_batch(batch, history)
+                imported += len(batch)
+                batch = []
+        self.import_batch(batch, history)
+        imported += len(batch)
+
+        if path.exists():
+            path.rename(path.with_suffix(".bin.imported"))
+        # the file is gone now, so these rows can't be counted a second time
+        if history is not None:
+            self.radar.merge(history)
+        return imported
+
+    def import_batch(self, rows: list[Row], history: RadarRollup | None) -> None:
+        self.store.append(rows)
+        if history is not None:
+            for row in rows:
+                history.add(row)
 
 
 def metrics_reader(
     path: Path | None = None,
 ) -> typing.Generator[tuple[float, Item], None, None]:
     if path is None:
-        path = DEFAULT
+        path = LEGACY
     if path.exists():
-        all_bytes = path.read_bytes()
         unpacker = msgpack.Unpacker(use_list=False)
-        unpacker.feed(all_bytes)
-        yield from unpacker
+        with path.open("rb") as file:
+            while chunk := file.read(LEGACY_CHUNK_SIZE):
+                unpacker.feed(chunk)
+                yield from unpacker
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import collections
+import logging
+import threading
+import typing
+from datetime import datetime
+
+from .store import Row
+from .types import GuildResultDict, Stat
+
+logger = logging.getLogger(__name__)
+DAY = 60 * 60 * 24
+WINDOW = 30  # days
+GLOBAL = 0
+
+phishing_rules = (
+    "phishing.content",
+    "phishing.domain.blacklisted",
+    "phishing.domain.heuristic",
+    "phishing.embed",
+)
+ping = (
+    "ping.users.many",
+    "ping.users.few",
+    "ping.roles",
+    "ping.broad",
+    "ping.hidden",
+)
+advertisement = ("advertisement.discord.invite",)
+other = ("selfbot.embed", "emoji.mass", "worker")
+all_rules = phishing_rules + ping + advertisement + other
+
+traffic = (
+    "traffic.similar",
+    "traffic.exact",
+    "traffic.token",
+    "traffic.sticker",
+    "traffic.attachment",
+)
+
+challenge_actions = ("ban", "kick", "role", "timeout", "failure")
+categories = (
+    "phishing",
+    "antispam",
+    "advertisement",
+    "other",
+    "dehoist",
+    "antiraid",
+    "impersonation_discord",
+)
+
+Section = typing.Literal["rules", "traffic", "categories", "challenges"]
+Key = tuple[Section, str]
+
+
+def classify(row: Row) -> tuple[Key, ...]:
+    if row.name == "challenge":
+        category = ""
+        if row.rule == "antiraid_limit":
+            category = "antiraid"
+        elif row.rule == "impersonation_discord":
+            category = "impersonation_discord"
+
+        if category:
+            return (("challenges", row.action), ("categories", category))
+        return (("challenges", row.action),)
+
+    elif row.name == "delete":
+        if row.rule in all_rules:
+            if row.rule in phishing_rules:
+                category = "phishing"
+            elif row.rule in advertisement:
+                category = "advertisement"
+            else:
+                category = "other"
+            return (("rules", row.rule), ("categories", category))
+        elif row.rule in traffic:
+            return (("traffic", row.rule), ("categories", "antispam"))
+        logger.warning(f"unknown rule: {row.rule}")
+
+    elif row.name == "nickname":
+        if row.action in ("reset_success", "success"):
+            return (("categories", row.rule),)
+
+    return ()
+
+
+def merge_counters(
+    target: dict[int, collections.Counter[Key]],
+    source: dict[int, collections.Counter[Key]],
+) -> None:
+    for guild, counter in source.items():
+        if guild not in target:
+            target[guild] = collections.Counter()
+        target[guild].update(counter)
+
+
+def current_day() -> int:
+    return int(datetime.utcnow().timestamp() // DAY)
+
+
+class RadarRollup:
+    """
+    Per day and per guild counters of the radar categories. The 30 day windows
+    are kept up to date by moving whole day buckets when the day changes.
+    """
+
+    days: dict[int, dict[int, collections.Counter[Key]]]
+    total: dict[int, collections.Counter[Key]]
+    now: dict[int, collections.Counter[Key]]
+    previous: dict[int, collections.Counter[Key]]
+
+    def __init__(self, today: int | None = None) -> None:
+        self.today = current_day() if today is None else today
+        self.days = {}
+        self.total = {}
+        self.now = {}
+        self.previous = {}
+        # history is loaded in a thread while new events are counted live
+        self._lock = threading.RLock()
+
+    def span(self, day: int) -> dict[int, collections.Counter[Key]] | None:
+        age = self.today - day
+        if age < WINDOW:
+            return self.now
+        elif age < WINDOW * 2:
+            return self.previous
+        return None
+
+    def add(self, row: Row) -> None:
+        keys = classify(row)
+        day = int(row.timestamp // DAY)
+        with self._lock:
+            if day > self.today:
+                self.advance(day)
+            span = self.span(day)
+
+            for guild in (row.guild, GLOBAL):
+                counters = [self.total]
+                if span is not None:
+                    counters.append(span)
+                    counters.append(self.days.setdefault(day, {}))
+                for counter in counters:
+                    if guild not in counter:
+                        counter[guild] = collections.Counter()
+                    for key in keys:
+                        counter[guild][key] += row.hits
+
+    def merge(self, other: RadarRollup) -> None:
+        """Add the counters of `other`, which must not be in use anymore."""
+        with self._lock:
+            today = max(self.today, other.today)
+            self._advance(today)
+            other._advance(today)
+            for target, source in (
+                (self.total, other.total),
+                (self.now, other.now),
+                (self.previous, other.previous),
+            ):
+                merge_counters(target, source)
+            for day, counters in other.days.items():
+                merge_counters(self.days.setdefault(day, {}), counters)
+
+    def advance(self, today: int | None = None) -> None:
+        if today is None:
+            today = current_day()
+        with self._lock:
+            self._advance(today)
+
+    def _advance(self, today: int) -> None:
+        if today <= self.today:
+            return
+
+        old_spans = {day: self.span(day) for day in self.days}
+        self.today = today
+        for day, old_span in old_spans.items():
+            new_span = self.span(day)
+            if new_span is old_span:
+                continue
+            for guild, counter in self.days[day].items():
+                if old_span is not None:
+                    old_span[guild].subtract(counter)
+                if new_span is not None:
+                    if guild not in new_span:
+                        new_span[guild] = collections.Counter()
+                    new_span[guild].update(counter)
+            if new_span is None:
+                del self.days[day]
+
+    def radar(self, guild: int = GLOBAL) -> GuildResultDict:
+        empty: collections.Counter[Key] = collections.Counter()
+        with self._lock:
+            total = self.total.get(guild, empty).copy()
+            now = self.now.get(guild, empty).copy()
+            previous = self.previous.get(guild, empty).copy()
+
+        def stat(key: Key) -> Stat:
+            return {"total": total[key], "previous": previous[key], "now": now[key]}
+
+        return {
+            "rules": {rule: stat(("rules", rule)) for rule in all_rules},
+            "traffic": {rule: stat(("traffic", rule)) for rule in traffic},
+            "categories": {
+                category: stat(("categories", category)) for category in categories
+            },
+            "challenges": {
+                action: stat(("challenges", action)) for action in challenge_actions
+            },
+        }
+
+    def guilds(self) -> list[int]:
+        with self._lock:
+            return [guild for guild in self.total if guild != GLOBAL]
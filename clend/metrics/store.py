@@ -0,0 +1,301 @@
+"""
+Append-only columnar storage for metric events.
+
+Every UTC day is a segment directory containing one file per column. Strings
+(name, action and rule) are dictionary encoded into `strings.txt`, so every
+row has a fixed width and segments can be memory-mapped without parsing.
+
+    metrics/strings.txt
+    metrics/2022-09-08/timestamp  float64
+    metrics/2022-09-08/guild      uint64
+    metrics/2022-09-08/name       uint16
+    metrics/2022-09-08/action     uint16
+    metrics/2022-09-08/rule       uint16
+    metrics/2022-09-08/count      uint32 (only in rolled up segments)
+"""
+
+from __future__ import annotations
+
+import collections
+import itertools
+import logging
+import mmap
+import shutil
+import threading
+import typing
+from array import array
+from datetime import date, datetime, timezone
+from io import BufferedWriter
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+DEFAULT = Path("metrics")
+COLUMNS = (
+    ("timestamp", "d"),
+    ("guild", "Q"),
+    ("name", "H"),
+    ("action", "H"),
+    ("rule", "H"),
+)
+COUNT_COLUMN = ("count", "I")
+MAX_STRINGS = 1 << 16
+
+
+class Row(typing.NamedTuple):
+    timestamp: float
+    guild: int
+    name: str
+    action: str
+    rule: str
+    hits: int = 1  # rows of a rolled up segment stand for several events
+
+
+class StringDictionary:
+    strings: list[str]
+    codes: dict[str, int]
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.strings = [""]
+        self.codes = {"": 0}
+        if path.exists():
+            for line in path.read_text().splitlines():
+                self.codes[line] = len(self.strings)
+                self.strings.append(line)
+
+    def encode(self, value: str) -> int:
+        code = self.codes.get(value, None)
+        if code is not None:
+            return code
+        if len(self.strings) >= MAX_STRINGS or "\n" in value:
+            logger.warning(f"unable to encode metrics string: {value!r}")
+            return 0
+
+        # written before any row referencing it, so a crash can't corrupt rows
+        with self.path.open("a") as file:
+            file.write(value + "\n")
+        self.codes[value] = code = len(self.strings)
+        self.strings.append(value)
+        return code
+
+    def decode(self, code: int) -> str:
+        return self.strings[code] if code < len(self.strings) else ""
+
+
+class Segment:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.day = date.fromisoformat(path.name)
+
+    @property
+    def is_rollup(self) -> bool:
+        return (self.path / COUNT_COLUMN[0]).exists()
+
+    @property
+    def columns(self) -> tuple[tuple[str, str], ...]:
+        return COLUMNS + (COUNT_COLUMN,) if self.is_rollup else COLUMNS
+
+    def __len__(self) -> int:
+        lengths = []
+        for name, typecode in self.columns:
+            file = self.path / name
+            size = file.stat().st_size if file.exists() else 0
+            lengths.append(size // array(typecode).itemsize)
+        return min(lengths)
+
+    def repair(self) -> None:
+        # a crash during a flush can leave columns of different lengths
+        rows = len(self)
+        for name, typecode in self.columns:
+            file = self.path / name
+            size = rows * array(typecode).itemsize
+            if file.exists() and file.stat().st_size != size:
+                logger.warning(f"truncating {file} to {rows} rows")
+                with file.open("r+b") as fp:
+                    fp.truncate(size)
+
+    def read(
+        self, start: int = 0, stop: int | None = None
+    ) -> typing.Generator[tuple[float, int, int, int, int, int], None, None]:
+        rows = len(self) if stop is None else min(stop, len(self))
+        if rows <= start:
+            return
+
+        maps: list[mmap.mmap] = []
+        views: list[memoryview] = []
+        try:
+            for name, typecode in self.columns:
+                with (self.path / name).open("rb") as fp:
+                    mapped = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+                maps.append(mapped)
+                itemsize = array(typecode).itemsize
+                view = memoryview(mapped)[: rows * itemsize].cast(typecode)
+                views.append(view[start:rows])
+
+            counts: typing.Iterable[int] = (
+                views[len(COLUMNS)] if self.is_rollup else itertools.repeat(1)
+            )
+            yield from zip(*views[: len(COLUMNS)], counts)
+        finally:
+            for view in views:
+                view.release()
+            for mapped in maps:
+                mapped.close()
+
+
+class MetricsStore:
+    _handles: dict[str, BufferedWriter]
+    _handles_day: date | None = None
+
+    def __init__(self, path: Path | None = None) -> None:
+        if path is None:
+            path = DEFAULT
+        self.path = path
+        if not path.exists():
+            path.mkdir(parents=True)
+        self.strings = StringDictionary(path / "strings.txt")
+        self._handles = {}
+        # appends can come from the event loop and a loader thread at once
+        self._lock = threading.RLock()
+        self.recover()
+
+    def recover(self) -> None:
+        for tmp in self.path.glob("*.tmp"):
+            shutil.rmtree(tmp)
+        for old in self.path.glob("*.old"):
+            target = old.with_suffix("")
+            if target.exists():
+                shutil.rmtree(old)
+            else:
+                old.rename(target)
+
+    def segments(self) -> list[Segment]:
+        return [
+            Segment(path)
+            for path in sorted(self.path.iterdir())
+            if path.is_dir() and "." not in path.name
+        ]
+
+    def append(self, rows: typing.Iterable[Row]) -> None:
+        days: dict[date, list[Row]] = collections.defaultdict(list)
+        for row in rows:
+            day = datetime.fromtimestamp(row.timestamp, timezone.utc).date()
+            days[day].append(row)
+
+        encode = self.strings.encode
+        with self._lock:
+            for day, day_rows in sorted(days.items()):
+                handles = self._open(day)
+                values: tuple[list[typing.Any], ...] = (
+                    [row.timestamp for row in day_rows],
+                    [row.guild for row in day_rows],
+                    [encode(row.name) for row in day_rows],
+                    [encode(row.action) for row in day_rows],
+                    [encode(row.rule) for row in day_rows],
+                )
+                for (name, typecode), column in zip(COLUMNS, values):
+                    handles[name].write(array(typecode, column).tobytes())
+                if COUNT_COLUMN[0] in handles:  # late rows for a rolled up day
+                    counts = array(COUNT_COLUMN[1], [row.hits for row in day_rows])
+                    handles[COUNT_COLUMN[0]].write(counts.tobytes())
+                for handle in handles.values():
+                    handle.flush()
+
+    def _open(self, day: date) -> dict[str, BufferedWriter]:
+        if day == self._handles_day:
+            return self._handles
+
+        self.close()
+        path = self.path / day.isoformat()
+        if not path.exists():
+            path.mkdir()
+        segment = Segment(path)
+        segment.repair()
+
+        self._handles = {name: (path / name).open("ab") for name, _ in segment.columns}
+        self._handles_day = day
+        return self._handles
+
+    def close(self) -> None:
+        with self._lock:
+            for handle in self._handles.values():
+                handle.close()
+            self._handles = {}
+            self._handles_day = None
+
+    def snapshot(self) -> dict[date, int]:
+        with self._lock:
+            return {segment.day: len(segment) for segment in self.segments()}
+
+    def read(
+        self, since: date | None = None, snapshot: dict[date, int] | None = None
+    ) -> typing.Generator[Row, None, None]:
+        """
+        Iterate all rows, optionally only the ones that existed when `snapshot`
+        was taken so rows appended in the meantime aren't read twice.
+        """
+        decode = self.strings.decode
+        for segment in self.segments():
+            if since is not None and segment.day < since:
+                continue
+            stop = None
+            if snapshot is not None:
+                if segment.day not in snapshot:
+                    continue
+                stop = snapshot[segment.day]
+            for timestamp, guild, name, action, rule, count in segment.read(stop=stop):
+                yield Row(
+                    timestamp, guild, decode(name), decode(action), decode(rule), count
+                )
+
+    def rollup(self, before: date) -> int:
+        """
+        Aggregate raw segments older than `before` into one row per guild, name,
+        action and rule with a count. Returns the amount of rolled up segments.
+        """
+        with self._lock:
+            return self._rollup(before)
+
+    def _rollup(self, before: date) -> int:
+        rolled_up = 0
+        for segment in self.segments():
+            if segment.day >= before or segment.day == self._handles_day:
+                continue
+            elif segment.is_rollup:
+                continue
+
+            counter: collections.Counter[tuple[int, int, int, int]] = (
+                collections.Counter()
+            )
+            for _, guild, name_code, action, rule, count in segment.read():
+                counter[(guild, name_code, action, rule)] += count
+
+            timestamp = datetime(
+                segment.day.year,
+                segment.day.month,
+                segment.day.day,
+                tzinfo=timezone.utc,
+            ).timestamp()
+            keys = tuple(counter)
+            values: tuple[list[typing.Any], ...] = (
+                [timestamp] * len(keys),
+                [key[0] for key in keys],
+                [key[1] for key in keys],
+                [key[2] for key in keys],
+                [key[3] for key in keys],
+                [counter[key] for key in keys],
+            )
+
+            tmp = segment.path.with_suffix(".tmp")
+            tmp.mkdir()
+            for (name, typecode), column in zip(COLUMNS + (COUNT_COLUMN,), values):
+                (tmp / name).write_bytes(array(typecode, column).tobytes())
+
+            old = segment.path.with_suffix(".old")
+            segment.path.rename(old)
+            tmp.rename(segment.path)
+            shutil.rmtree(old)
+            rolled_up += 1
+            logger.debug(f"rolled up {segment.day} ({len(keys)} rows)")
+
+        return rolled_up
@@ -3,11 +3,14 @@ from __future__ import annotations
 import typing
 
 
-class ResultDict(typing.TypedDict):
+class GuildResultDict(typing.TypedDict):
     rules: dict[str, Stat]
     traffic: dict[str, Stat]
     categories: dict[str, Stat]
     challenges: dict[str, Stat]
+
+
+class ResultDict(GuildResultDict):
     stats: dict[str, int]
 
 
@@ -19,3 +19,14 @@ class SlowTimerEvent(Event):
     app: GatewayBotAware = attr.field()
 
     sequence: int = attr.field()
+
+
+@attr.define()
+class VerificationDueEvent(Event):
+    """Members of a guild that had to verify by now."""
+
+    app: GatewayBotAware = attr.field()
+
+    guild_id: int = attr.field()
+
+    user_ids: tuple[int, ...] = attr.field()
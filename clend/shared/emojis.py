@@ -0,0 +1,94 @@
+import re
+import typing
+
+import emoji  # type: ignore
+
+Tree = dict[str, typing.Any]
+END = ""  # never a single character, marks the end of an emoji in the tree
+
+
+def _build() -> tuple[Tree, re.Pattern[str]]:
+    tree: Tree = {}
+    for value, data in emoji.EMOJI_DATA.items():
+        node = tree
+        for char in value:
+            node = node.setdefault(char, {})
+        node[END] = "en" in data  # demojize keeps untranslated emoji
+
+    # a class with every first character is slow to match, use the 256 code
+    # point blocks they are in and let the tree lookup filter the rest
+    ranges: list[list[int]] = []
+    for block in sorted({ord(x) >> 8 for x in tree if not x.isascii()}):
+        if ranges and ranges[-1][1] == block - 1:
+            ranges[-1][1] = block
+        else:
+            ranges.append([block, block])
+    blocks = "".join(
+        f"{re.escape(chr(max(start << 8, 0x80)))}-{re.escape(chr(end << 8 | 0xFF))}"
+        for start, end in ranges
+    )
+    pattern = re.compile(
+        rf"[{blocks}]"  # maybe the start of an unicode emoji
+        r"|[#*0-9](?=[\ufe0f\u20e3])"  # keycaps, only when one follows
+    )
+    return tree, pattern
+
+
+_tree, _pattern = _build()
+# custom emoji and :shortcodes:, matched after the unicode emojis were replaced
+_shortcodes = re.compile(r"<a?:[^\s:]+:\d+>|:[^\s:]+:")
+# what demojize turns an emoji into, as far as `_shortcodes` can tell
+PLACEHOLDER = ":_:"
+# variation selectors outside of an emoji, demojize drops them
+_selectors = re.compile("[\ufe0e\ufe0f]")
+
+
+def _emoji_spans(content: str) -> typing.Iterator[tuple[int, int]]:
+    """Start and end of the unicode emojis demojize translates."""
+    position = 0
+    length = len(content)
+    while True:
+        match = _pattern.search(content, position)
+        if match is None:
+            return
+        # longest sequence in the tree, the same walk demojize does
+        node = _tree.get(match.group(), None)
+        position = match.end()
+        if node is None:
+            continue
+        while position < length and content[position] in node:
+            node = node[content[position]]
+            position += 1
+        if node.get(END, False):
+            yield match.start(), position
+        else:
+            position = match.start() + 1
+
+
+def count_emojis(content: str, limit: int | None = None) -> int:
+    """
+    Number of unicode, custom and :shortcode: emojis in the content, counted
+    like `emoji.demojize` followed by a regex over the shortcodes. Stops once
+    `limit` is reached.
+    """
+    if ":" not in content:
+        # every emoji becomes exactly one shortcode and nothing else matches
+        matches: typing.Iterator[object] = _emoji_spans(content)
+    else:
+        # the colons around a replaced emoji can close or open a shortcode next
+        # to it, so the shortcodes are matched on the replaced content
+        parts = []
+        position = 0
+        for start, end in _emoji_spans(content):
+            parts.append(content[position:start])
+            parts.append(PLACEHOLDER)
+            position = end
+        parts.append(content[position:])
+        matches = _shortcodes.finditer(_selectors.sub("", "".join(parts)))
+
+    count = 0
+    for _ in matches:
+        if count == limit:
+            break
+        count += 1
+    return count
@@ -0,0 +1,22 @@
+"""
+Message features that several components compute. They are memoized by
+content, so a message that went through the rules and mitigations doesn't pay
+for normalizing or finding urls again when it is scored for traffic.
+"""
+
+import functools
+
+from cleaner_data.normalize import normalize
+from cleaner_data.url import get_urls
+
+CACHE_SIZE = 4096
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def normalized(content: str, remove_urls: bool = True) -> str:
+    return normalize(content, remove_urls=remove_urls)  # type: ignore
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def urls(content: str) -> tuple[str, ...]:
+    return tuple(get_urls(content))
@@ -0,0 +1,185 @@
+"""
+Low overhead timing of hot code paths.
+
+Every instrumented callable gets a small integer id once, at registration.
+Threads record into their own `Recorder`, which holds one preallocated
+histogram per id, so recording is an index lookup and a couple of integer
+increments without allocations or locks.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import typing
+
+logger = logging.getLogger(__name__)
+# 4 buckets per power of two from 1µs up to ~67s, quantiles are at most 25% high
+SUBBUCKETS = 4
+OCTAVES = 26
+BUCKETS = OCTAVES * SUBBUCKETS + 1
+QUANTILES = (0.5, 0.99)
+
+
+def bucket_index(seconds: float) -> int:
+    micros = seconds * 1_000_000
+    if micros < 1:
+        return 0
+    mantissa, exponent = math.frexp(micros)  # micros = mantissa * 2**exponent
+    index = exponent * SUBBUCKETS + int((mantissa * 2 - 1) * SUBBUCKETS) - 3
+    return index if index < BUCKETS else BUCKETS - 1
+
+
+def bucket_bound(index: int) -> float:
+    """Upper bound of a bucket in seconds."""
+    if index == 0:
+        return 1e-6
+    exponent, sub = divmod(index + 3, SUBBUCKETS)
+    return 2.0 ** (exponent - 1) * (1 + (sub + 1) / SUBBUCKETS) / 1_000_000
+
+
+class Histogram:
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self) -> None:
+        self.buckets = [0] * BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.buckets[bucket_index(seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other: Histogram) -> None:
+        for index, count in enumerate(other.buckets):
+            if count:
+                self.buckets[index] += count
+        self.count += other.count
+        self.total += other.total
+        if other.max > self.max:
+            self.max = other.max
+
+    def quantile(self, quantile: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = quantile * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bucket_bound(index), self.max)
+        return self.max
+
+    def reset(self) -> None:
+        self.buckets[:] = [0] * BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class Recorder:
+    """Per thread histograms. Only the owning thread may record."""
+
+    def __init__(self, instruments: Instruments) -> None:
+        self.instruments = instruments
+        self.histograms = [Histogram() for _ in instruments.names]
+        self.totals = Histogram()
+        # scratch space for the per callable durations of the current run
+        self.durations = [0.0] * max(len(instruments.names), 1)
+        self.skipped = 0
+
+    def record(self, ids: typing.Sequence[int], ran: int, total: float) -> bool:
+        """
+        Record the first `ran` durations of the current run. Returns True if the
+        run exceeded the report threshold.
+        """
+        instruments = self.instruments
+        self.skipped += 1
+        if self.skipped >= instruments.sample_every:
+            self.skipped = 0
+            histograms = self.histograms
+            durations = self.durations
+            for index in range(ran):
+                histograms[ids[index]].record(durations[index])
+            self.totals.record(total)
+        return total > instruments.report_threshold
+
+    def report(
+        self, name: str, ids: typing.Sequence[int], ran: int, total: float
+    ) -> None:
+        names = self.instruments.names
+        lines = [
+            f"{self.durations[index] * 1000:>3.3f} ms {names[ids[index]]}"
+            for index in range(ran)
+        ]
+        logger.warning(f"{name} took {total * 1000:.3f}ms\n" + "\n".join(lines))
+
+
+class Instruments:
+    names: list[str]
+    ids: dict[typing.Any, int]
+    recorders: list[Recorder]
+
+    def __init__(
+        self, prefix: str, sample_every: int = 1, report_threshold: float = 0.01
+    ) -> None:
+        self.prefix = prefix
+        self.sample_every = sample_every
+        self.report_threshold = report_threshold
+        self.names = []
+        self.ids = {}
+        self.recorders = []
+
+    def register(self, func: typing.Callable[..., typing.Any]) -> int:
+        callback_id = self.ids.get(func, None)
+        if callback_id is None:
+            self.ids[func] = callback_id = len(self.names)
+            self.names.append(f"{func.__module__}.{func.__qualname__}")
+        return callback_id
+
+    def recorder(self) -> Recorder:
+        # recorders are created after all callables have been registered
+        recorder = Recorder(self)
+        self.recorders.append(recorder)
+        return recorder
+
+    def histograms(self) -> dict[str, Histogram]:
+        """Merge the histograms of all recorders, the values are approximate."""
+        merged = {name: Histogram() for name in self.names}
+        for recorder in self.recorders:
+            for name, histogram in zip(self.names, recorder.histograms):
+                merged[name].merge(histogram)
+        return merged
+
+    def totals(self) -> Histogram:
+        merged = Histogram()
+        for recorder in self.recorders:
+            merged.merge(recorder.totals)
+        return merged
+
+    def reset(self) -> None:
+        for recorder in self.recorders:
+            for histogram in recorder.histograms:
+                histogram.reset()
+            recorder.totals.reset()
+
+    def prometheus(self) -> str:
+        metric = f"{self.prefix}_seconds"
+        lines = [f"# TYPE {metric} summary"]
+        histograms = list(self.histograms().items())
+        histograms.append(("total", self.totals()))
+        for name, histogram in histograms:
+            label = f'callback="{name}"'
+            for quantile in QUANTILES:
+                value = histogram.quantile(quantile)
+                lines.append(f'{metric}{{{label},quantile="{quantile}"}} {value:.9f}')
+            lines.append(f"{metric}_sum{{{label}}} {histogram.total:.9f}")
+            lines.append(f"{metric}_count{{{label}}} {histogram.count}")
+        lines.append(f"# TYPE {metric}_max gauge")
+        for name, histogram in histograms:
+            lines.append(f'{metric}_max{{callback="{name}"}} {histogram.max:.9f}')
+        return "\n".join(lines) + "\n"
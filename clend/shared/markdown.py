@@ -0,0 +1,33 @@
+import re
+
+_patterns: dict[tuple[str, ...], re.Pattern[str]] = {}
+
+
+def _pattern(keys: tuple[str, ...]) -> re.Pattern[str]:
+    pattern = _patterns.get(keys, None)
+    if pattern is None:
+        alternatives = "|".join(map(re.escape, keys))
+        if any("`" in key for key in keys):
+            # overlapping occurrences can differ in escaping only when the key
+            # has backticks itself, find all of them with a lookahead
+            alternatives = f"(?=(?:{alternatives}))"
+        pattern = _patterns[keys] = re.compile(alternatives)
+    return pattern
+
+
+def find_unescaped(content: str, *keys: str) -> int | None:
+    """
+    Position of the first key that is not inside an inline code span.
+
+    A key is escaped when an odd number of backticks precedes it and at least
+    one follows it. Runs in a single pass over the content.
+    """
+    total = content.count("`")
+    before = last = 0
+    for match in _pattern(keys).finditer(content):
+        position = match.start()
+        before += content.count("`", last, position)
+        last = position
+        if before % 2 == 0 or before == total:
+            return position
+    return None
@@ -0,0 +1,53 @@
+import asyncio
+import itertools
+import logging
+import typing
+
+from coredis import Redis
+
+logger = logging.getLogger(__name__)
+Command = tuple[str, tuple[typing.Any, ...]]
+Written = typing.Callable[[tuple[Command, ...]], None]
+
+
+class BatchWriter:
+    """Sends redis commands in pipelined batches with limited concurrency."""
+
+    def __init__(
+        self,
+        database: Redis[typing.Any],
+        batch_size: int = 100,
+        concurrency: int = 4,
+        on_written: Written | None = None,
+    ) -> None:
+        self.database = database
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.on_written = on_written  # called with every batch that succeeded
+        self.written = 0
+        self.batches = 0
+
+    async def write(self, commands: typing.Iterable[Command]) -> None:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = []
+        iterator = iter(commands)
+        while batch := tuple(itertools.islice(iterator, self.batch_size)):
+            await semaphore.acquire()
+            tasks.append(asyncio.create_task(self.write_batch(batch, semaphore)))
+        await asyncio.gather(*tasks)
+
+    async def write_batch(
+        self, batch: tuple[Command, ...], semaphore: asyncio.Semaphore
+    ) -> None:
+        try:
+            pipe = await self.database.pipeline(transaction=False)
+            for name, args in batch:
+                await getattr(pipe, name)(*args)
+            await pipe.execute()
+        finally:
+            semaphore.release()
+
+        self.written += len(batch)
+        self.batches += 1
+        if self.on_written is not None:
+            self.on_written(batch)
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import logging
+import sys
+import threading
+import time
+import traceback
+import types
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+SAMPLE_INTERVAL = 0.005
+HEARTBEAT_INTERVAL = 0.05
+STALL_THRESHOLD = 0.25
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of all threads and aggregates them in the collapsed stack
+    format used by flamegraph.pl and speedscope.
+    """
+
+    stacks: collections.Counter[str]
+    labels: dict[types.CodeType, str]
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL) -> None:
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.labels = {}
+        self.samples = 0
+
+    def label(self, code: types.CodeType) -> str:
+        label = self.labels.get(code, None)
+        if label is None:
+            filename = Path(code.co_filename).name
+            label = f"{code.co_name} ({filename}:{code.co_firstlineno})"
+            self.labels[code] = label
+        return label
+
+    def sample(self) -> None:
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            current: types.FrameType | None = frame
+            while current is not None:
+                stack.append(self.label(current.f_code))
+                current = current.f_back
+            stack.append(names.get(ident, str(ident)))
+            self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def run(self, duration: float) -> None:
+        """Sample for `duration` seconds, blocks the calling thread."""
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            self.sample()
+            time.sleep(self.interval)
+
+    def write(self, path: Path) -> None:
+        with path.open("w") as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+
+
+class LoopWatchdog:
+    """
+    Logs the stack of the event loop thread when a callback blocks the loop for
+    longer than `threshold` seconds. Unlike asyncio debug mode this only costs a
+    timer callback on the loop and a sleeping thread.
+    """
+
+    thread: threading.Thread | None = None
+    handle: asyncio.TimerHandle | None = None
+
+    def __init__(self, threshold: float = STALL_THRESHOLD) -> None:
+        self.threshold = threshold
+        self.heartbeat = time.monotonic()
+        self.stalls = 0
+        self.running = False
+        self.loop_thread = 0
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.running = True
+        self.loop_thread = threading.get_ident()
+        self.beat(loop)
+        self.thread = threading.Thread(
+            target=self.watch, name="loop-watchdog", daemon=True
+        )
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.running = False
+        if self.handle is not None:
+            self.handle.cancel()
+
+    def beat(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.heartbeat = time.monotonic()
+        self.handle = loop.call_later(HEARTBEAT_INTERVAL, self.beat, loop)
+
+    def watch(self) -> None:
+        reported = 0.0
+        while self.running:
+            time.sleep(HEARTBEAT_INTERVAL)
+            heartbeat = self.heartbeat
+            stalled = time.monotonic() - heartbeat
+            if stalled < self.threshold or heartbeat == reported:
+                continue
+
+            reported = heartbeat  # report every stall once
+            self.stalls += 1
+            frame = sys._current_frames().get(self.loop_thread, None)
+            stack = "".join(traceback.format_stack(frame)) if frame else "unknown"
+            logger.warning(f"event loop blocked for {stalled * 1000:.0f}ms\n{stack}")
@@ -1,37 +1,122 @@
+import functools
 import math
+import threading
+import time
+from array import array
+from collections import OrderedDict
 
 import hikari
 from hikari.internal.time import utc_datetime
 
+TABLE_DAYS = 8192  # older accounts fall back to the formula
+CACHE_TTL = 60
+CACHE_SIZE = 100_000
+# the flags move the score by at most 0.2 before clamping to [0, 1], so the
+# base score can be capped without changing any result
+MAX_BASE = 2.0
 
-def calculate_risk_score(user: hikari.User) -> float:
-    age = (utc_datetime() - user.created_at).total_seconds() / 86400
-    if not age:
-        age = 0.000001
-    risk: float = 3 / math.log10(age) - (age ** 0.1) / 3
+
+def age_risk(age: float) -> float:
+    """Base risk of an account `age` days old."""
+    if age <= 1:  # the curve has its pole at one day
+        return MAX_BASE
+    risk = 3 / math.log10(age) - float(age**0.1) / 3
     if risk < 0:
-        risk = 1000
-    if user.avatar_hash is None:
-        risk += 0.17
-    else:
-        risk -= 0.04
-    if user.flags & (
+        return MAX_BASE
+    return min(risk, MAX_BASE)
+
+
+AGE_TABLE = array("d", (age_risk(day) for day in range(TABLE_DAYS + 1)))
+
+
+def age_risk_fast(age: float) -> float:
+    """`age_risk` interpolated between whole days."""
+    if age >= TABLE_DAYS:
+        return age_risk(age)
+    elif age <= 0:
+        return MAX_BASE
+    day = int(age)
+    low, high = AGE_TABLE[day], AGE_TABLE[day + 1]
+    if low == MAX_BASE or high == MAX_BASE:  # capped, or a jump in the curve
+        return age_risk(age)
+    return low + (high - low) * (age - day)
+
+
+@functools.lru_cache(maxsize=1024)
+def flags_risk(flags: int) -> float | None:
+    """Risk adjustment for the user flags, None for users that are trusted."""
+    user_flags = hikari.UserFlag(flags)
+    if user_flags & (
+        hikari.UserFlag.DISCORD_CERTIFIED_MODERATOR
+        | hikari.UserFlag.HYPESQUAD_EVENTS
+        | hikari.UserFlag.DISCORD_EMPLOYEE
+    ):
+        return None
+    risk = 0.0
+    if user_flags & (
         hikari.UserFlag.HYPESQUAD_BALANCE
         | hikari.UserFlag.HYPESQUAD_BRAVERY
         | hikari.UserFlag.HYPESQUAD_BRILLIANCE
     ):
         risk -= 0.01
-    if user.flags & hikari.UserFlag.EARLY_SUPPORTER:
+    if user_flags & hikari.UserFlag.EARLY_SUPPORTER:
         risk -= 0.05
-    if user.flags & (
+    if user_flags & (
         hikari.UserFlag.PARTNERED_SERVER_OWNER
         | hikari.UserFlag.EARLY_VERIFIED_DEVELOPER
     ):
         risk -= 0.1
-    if user.flags & (
-        hikari.UserFlag.DISCORD_CERTIFIED_MODERATOR
-        | hikari.UserFlag.HYPESQUAD_EVENTS
-        | hikari.UserFlag.DISCORD_EMPLOYEE
-    ):
-        risk = 0
+    return risk
+
+
+def calculate_risk_score(user: hikari.User) -> float:
+    flags = flags_risk(int(user.flags))
+    if flags is None:
+        return 0
+    age = (utc_datetime() - user.created_at).total_seconds() / 86400
+    risk = age_risk_fast(age) + flags
+    if user.avatar_hash is None:
+        risk += 0.17
+    else:
+        risk -= 0.04
     return max(0, min(1, risk))
+
+
+class RiskCache:
+    """
+    Risk scores by user id for a short time, so the join log and the challenge
+    share one computation per joiner. Used from the guild worker threads too.
+    """
+
+    scores: OrderedDict[int, tuple[float, float]]
+
+    def __init__(self, ttl: float = CACHE_TTL, size: int = CACHE_SIZE) -> None:
+        self.ttl = ttl
+        self.size = size
+        self.scores = OrderedDict()  # in order of expiry
+        self.lock = threading.Lock()
+
+    def get(self, user: hikari.User) -> float:
+        now = time.monotonic()
+        cached = self.scores.get(user.id, None)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+
+        risk = calculate_risk_score(user)
+        with self.lock:
+            self.scores.pop(user.id, None)
+            self.scores[user.id] = (now + self.ttl, risk)
+            while self.scores and (
+                len(self.scores) > self.size
+                or next(iter(self.scores.values()))[0] <= now
+            ):
+                self.scores.popitem(last=False)
+        return risk
+
+
+risk_cache = RiskCache()
+
+
+def risk_score(user: hikari.User) -> float:
+    """`calculate_risk_score`, shared between callers for `CACHE_TTL` seconds."""
+    return risk_cache.get(user)
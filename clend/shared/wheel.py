@@ -0,0 +1,101 @@
+"""
+Hierarchical timing wheel.
+
+Timers are kept in levels of `slots` buckets, each level `slots` times coarser
+than the one below. Scheduling and cancelling are O(1), advancing costs one
+bucket per tick plus moving timers down a level when a coarser bucket comes
+due, so nothing ever scans all pending timers.
+"""
+
+from __future__ import annotations
+
+import math
+import typing
+
+K = typing.TypeVar("K", bound=typing.Hashable)
+
+
+class TimingWheel(typing.Generic[K]):
+    # key -> (tick it is due, level, slot)
+    timers: dict[K, tuple[int, int, int]]
+    wheels: list[list[set[K]]]
+
+    def __init__(
+        self, now: float, tick: float = 1.0, slots: int = 64, levels: int = 3
+    ) -> None:
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.current = int(now // tick)  # last tick that was processed
+        self.timers = {}
+        self.wheels = [[set() for _ in range(slots)] for _ in range(levels)]
+
+    def __len__(self) -> int:
+        return len(self.timers)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self.timers
+
+    @property
+    def span(self) -> float:
+        """How far ahead timers can be scheduled."""
+        return float(self.slots**self.levels * self.tick)
+
+    def due(self, key: K) -> float | None:
+        timer = self.timers.get(key, None)
+        return None if timer is None else timer[0] * self.tick
+
+    def schedule(self, key: K, deadline: float) -> None:
+        """Fire `key` at `deadline`, replacing an earlier timer of the key."""
+        self.cancel(key)
+        due = max(math.ceil(deadline / self.tick), self.current + 1)
+        if due - self.current >= self.slots**self.levels:
+            raise ValueError(f"deadline is more than {self.span}s ahead")
+        self.place(key, due)
+
+    def place(self, key: K, due: int) -> None:
+        delta = due - self.current
+        level = 0
+        while delta >= self.slots ** (level + 1):
+            level += 1
+        slot = (due // self.slots**level) % self.slots
+        self.wheels[level][slot].add(key)
+        self.timers[key] = (due, level, slot)
+
+    def cancel(self, key: K) -> bool:
+        timer = self.timers.pop(key, None)
+        if timer is None:
+            return False
+        _, level, slot = timer
+        self.wheels[level][slot].discard(key)
+        return True
+
+    def advance(self, now: float) -> list[K]:
+        """Keys that are due by `now`, in order of their ticks."""
+        target = int(now // self.tick)
+        if not self.timers:
+            self.current = max(self.current, target)
+            return []
+
+        fired: list[K] = []
+        while self.current < target and self.timers:
+            self.current += 1
+            # move the timers of coarser buckets that start now a level down
+            level = 1
+            while level < self.levels and self.current % self.slots**level == 0:
+                slot = (self.current // self.slots**level) % self.slots
+                bucket = self.wheels[level][slot]
+                self.wheels[level][slot] = set()
+                for key in bucket:
+                    self.place(key, self.timers[key][0])
+                level += 1
+
+            slot = self.current % self.slots
+            bucket = self.wheels[0][slot]
+            if bucket:
+                self.wheels[0][slot] = set()
+                for key in bucket:
+                    del self.timers[key]
+                fired.extend(bucket)
+        self.current = max(self.current, target)
+        return fired
@@ -0,0 +1,3 @@
+from .ext import StatsExtension as extension
+
+__all__ = ["extension"]
@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import time
+import typing
+
+import hikari
+import msgpack  # type: ignore
+
+from ..app import TheCleanerApp
+from ..shared.custom_events import FastTimerEvent, SlowTimerEvent
+from ..shared.instrument import Histogram
+
+logger = logging.getLogger(__name__)
+TOP_GUILDS = 10
+
+
+def summarize(histogram: Histogram) -> dict[str, float]:
+    return {
+        "count": histogram.count,
+        "total": histogram.total,
+        "p50": histogram.quantile(0.5),
+        "p99": histogram.quantile(0.99),
+        "max": histogram.max,
+    }
+
+
+def by_p99(item: tuple[str, dict[str, float]]) -> float:
+    return item[1]["p99"]
+
+
+class StatsExtension:
+    """
+    Samples the guild workers, component timings and HTTP actions every fast
+    timer tick and writes the latest sample to redis every slow timer tick.
+    Sampling walks all guilds and merges the histograms of every worker, so it
+    runs in an executor.
+    """
+
+    listeners: list[tuple[typing.Type[hikari.Event], typing.Any]]
+    current: dict[str, typing.Any]
+    completed: dict[str, int]
+    busy_times: dict[int, tuple[float, int]]
+
+    def __init__(self, app: TheCleanerApp) -> None:
+        self.app = app
+        self.listeners = [
+            (FastTimerEvent, self.on_fast_timer),
+            (SlowTimerEvent, self.on_slow_timer),
+        ]
+        self.current = {}
+        self.completed = {}
+        self.busy_times = {}
+        self.last_sample = time.monotonic()
+        self.sampling = False
+
+    async def on_fast_timer(self, event: FastTimerEvent) -> None:
+        if self.sampling:  # the previous sample is still running
+            return
+        self.sampling = True
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.sample)
+        finally:
+            self.sampling = False
+
+    async def on_slow_timer(self, event: SlowTimerEvent) -> None:
+        if not self.current:
+            return
+        database = self.app.database
+        await database.set("stats", msgpack.packb(self.current))
+
+    def sample(self) -> None:
+        now = time.monotonic()
+        elapsed = max(now - self.last_sample, 1e-9)
+        self.last_sample = now
+
+        self.current = {
+            "timestamp": time.time(),
+            "interval": elapsed,
+            "workers": self.sample_workers(),
+            "components": self.sample_components(),
+            "guilds": self.sample_guilds(elapsed),
+            "buffers": self.sample_buffers(),
+            "http": self.sample_http(elapsed),
+        }
+
+    def sample_workers(self) -> list[dict[str, typing.Any]]:
+        guild = self.app.extensions.get("clend.guild", None)
+        if guild is None or guild.workers is None:
+            return []
+        return [
+            {
+                "index": worker.worker_index,
+                "alive": worker.thread is not None and worker.thread.is_alive(),
+                "queue": worker.queue.qsize(),
+                **summarize(worker.recorder.totals),
+            }
+            for worker in guild.workers
+        ]
+
+    def sample_components(self) -> dict[str, dict[str, float]]:
+        guild = self.app.extensions.get("clend.guild", None)
+        if guild is None:
+            return {}
+        return {
+            name: summarize(histogram)
+            for name, histogram in guild.instruments.histograms().items()
+            if histogram.count
+        }
+
+    def sample_guilds(self, elapsed: float) -> list[dict[str, typing.Any]]:
+        guild_ext = self.app.extensions.get("clend.guild", None)
+        if guild_ext is None:
+            return []
+
+        busy = []
+        busy_times = {}
+        for guild in tuple(guild_ext.guilds.values()):
+            busy_times[guild.id] = (guild.busy_time, guild.event_count)
+            busy_time, event_count = self.busy_times.get(guild.id, (0.0, 0))
+            if guild.busy_time > busy_time:
+                busy.append(
+                    (
+                        guild.busy_time - busy_time,
+                        guild.event_count - event_count,
+                        guild.id,
+                    )
+                )
+        self.busy_times = busy_times
+
+        busy.sort(reverse=True)
+        return [
+            {"guild": guild_id, "busy": busy_time / elapsed, "events": event_count}
+            for busy_time, event_count, guild_id in busy[:TOP_GUILDS]
+        ]
+
+    def sample_buffers(self) -> dict[str, int]:
+        guild_ext = self.app.extensions.get("clend.guild", None)
+        if guild_ext is None:
+            return {}
+        return typing.cast(dict[str, int], guild_ext.event_buffer_stats())
+
+    def sample_http(self, elapsed: float) -> dict[str, typing.Any]:
+        http_ext = self.app.extensions.get("clend.http", None)
+        if http_ext is None:
+            return {}
+
+        http = http_ext.http
+        completed = dict(http.completed)
+        rates = {
+            name: (count - self.completed.get(name, 0)) / elapsed
+            for name, count in completed.items()
+        }
+        self.completed = completed
+        return {
+            "queue": http.main_queue.async_q.qsize(),
+            "log_queue": http.log_queue.qsize(),
+            "delete_queue": http.delete_queue.qsize(),
+            "rates": rates,
+            "actions": {
+                name: summarize(histogram) for name, histogram in http.timings.items()
+            },
+        }
+
+    def format(self) -> str:
+        if not self.current:
+            return "no stats sampled yet"
+        stats = self.current
+        lines = [f"__Workers__ (last {stats['interval']:.1f}s)"]
+        for worker in stats["workers"]:
+            lines.append(
+                f"#{worker['index']}: queue {worker['queue']:,}, "
+                f"p99 {worker['p99'] * 1000:.2f}ms, max {worker['max'] * 1000:.2f}ms"
+                + ("" if worker["alive"] else " **dead**")
+            )
+
+        lines.append("\n__Slowest components__ (p99)")
+        components = sorted(
+            typing.cast(dict[str, dict[str, float]], stats["components"]).items(),
+            key=by_p99,
+            reverse=True,
+        )
+        for name, component in components[:TOP_GUILDS]:
+            lines.append(
+                f"`{name}` p50 {component['p50'] * 1000:.2f}ms, "
+                f"p99 {component['p99'] * 1000:.2f}ms, "
+                f"max {component['max'] * 1000:.2f}ms"
+            )
+
+        lines.append("\n__Busiest guilds__")
+        for guild in stats["guilds"]:
+            lines.append(
+                f"{guild['guild']}: {guild['busy']:.2%} busy, "
+                f"{guild['events']:,} events"
+            )
+
+        buffers = stats["buffers"]
+        if buffers:
+            lines.append(
+                f"\n__Event buffers__ pending {buffers['pending']:,}, "
+                f"buffered {buffers['buffered']:,}, "
+                f"dropped {buffers['dropped']:,}, "
+                f"replayed {buffers['replayed']:,}"
+            )
+
+        http = stats["http"]
+        if http:
+            lines.append(
+                f"\n__HTTP__ queue {http['queue']:,}, log {http['log_queue']:,}, "
+                f"delete {http['delete_queue']:,}"
+            )
+            for name, rate in sorted(http["rates"].items()):
+                lines.append(f"{name}: {rate:.2f}/s")
+        return "\n".join(lines)
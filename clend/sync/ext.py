@@ -1,4 +1,5 @@
 import asyncio
+import hashlib
 import logging
 import typing
 
@@ -8,13 +9,22 @@ import msgpack  # type: ignore
 from ..app import TheCleanerApp
 from ..shared.channel_perms import permissions_for
 from ..shared.dangerous import DANGEROUS_PERMISSIONS
+from ..shared.pipeline import BatchWriter, Command
 from ..shared.protect import protected_call
 
 logger = logging.getLogger(__name__)
+# events within this window are coalesced into a single sync per guild
+SYNC_DELAY = 1
+INITIAL_SYNC_BATCH_SIZE = 50
+INITIAL_SYNC_CONCURRENCY = 4
 
 
 class SyncExtension:
     listeners: list[tuple[typing.Type[hikari.Event], typing.Any]]
+    pending: dict[int, set[str]]
+    digests: dict[int, dict[str, bytes]]
+    # sync key -> guild id and digests, until the initial sync wrote them
+    staged_digests: dict[str, tuple[int, dict[str, bytes]]]
 
     def __init__(self, app: TheCleanerApp) -> None:
         self.app = app
@@ -32,14 +42,62 @@ class SyncExtension:
             (hikari.GuildUpdateEvent, self.on_guild_update),
         ]
         self.task = None
+        self.pending = {}
+        self.digests = {}
+        self.staged_digests = {}
+        self.initial_sync_total = 0
+        self.initial_sync_done = 0
 
     def on_load(self) -> None:
         asyncio.create_task(protected_call(self.loader()))
 
     async def loader(self) -> None:
-        for guild in tuple(self.app.bot.cache.get_guilds_view().values()):
-            await self.new_guild(guild)
-        logger.info("initial sync done")
+        # the guild settings are needed to moderate, the sync only for the dashboard
+        conf = self.app.extensions.get("clend.conf", None)
+        if conf is None:
+            logger.warning("unable to find clend.conf extension")
+        else:
+            await conf.loaded.wait()
+
+        guilds = tuple(self.app.bot.cache.get_guilds_view().values())
+        self.initial_sync_total = len(guilds)
+        writer = BatchWriter(
+            self.app.database,
+            batch_size=INITIAL_SYNC_BATCH_SIZE,
+            concurrency=INITIAL_SYNC_CONCURRENCY,
+            on_written=self.initial_sync_written,
+        )
+        try:
+            await writer.write(self.initial_sync(guilds))
+        finally:
+            # guilds of failed batches get written in full on their next sync
+            self.staged_digests.clear()
+        logger.info(
+            f"initial sync done ({writer.written} guilds in {writer.batches} batches)"
+        )
+
+    def initial_sync(
+        self, guilds: tuple[hikari.GatewayGuild, ...]
+    ) -> typing.Generator[Command, None, None]:
+        for guild in guilds:
+            data = self.new_guild_data(guild)
+            packed = {key: msgpack.packb(value) for key, value in data.items()}
+            digests = {
+                key: hashlib.blake2b(value, digest_size=16).digest()
+                for key, value in packed.items()
+            }
+            sync_key = f"guild:{guild.id}:sync"
+            self.staged_digests[sync_key] = (guild.id, digests)
+            yield ("hset", (sync_key, packed))
+
+    def initial_sync_written(self, batch: tuple[Command, ...]) -> None:
+        for _, (sync_key, _) in batch:
+            staged = self.staged_digests.pop(sync_key, None)
+            if staged is None:
+                continue
+            guild_id, digests = staged
+            self.digests[guild_id] = digests
+            self.initial_sync_done += 1
 
     async def on_new_guild(
         self, event: hikari.GuildJoinEvent | hikari.GuildAvailableEvent
@@ -49,66 +107,63 @@ class SyncExtension:
             await self.new_guild(guild)
 
     async def new_guild(self, guild: hikari.GatewayGuild) -> None:
-        await self.sync(
-            guild.id,
-            {
-                "added": 1,
-                "guild": self.sync_guild(guild),
-                "myself": self.sync_myself(guild),
-                "roles": self.sync_roles(guild),
-                "channels": self.sync_channels(guild),
-            },
-        )
+        await self.sync(guild.id, self.new_guild_data(guild))
+
+    def new_guild_data(self, guild: hikari.GatewayGuild) -> dict[str, typing.Any]:
+        return {
+            "added": 1,
+            "guild": self.sync_guild(guild),
+            "myself": self.sync_myself(guild),
+            "roles": self.sync_roles(guild),
+            "channels": self.sync_channels(guild),
+        }
 
     async def on_destroy_guild(self, event: hikari.GuildLeaveEvent) -> None:
+        self.pending.pop(event.guild_id, None)
+        self.digests.pop(event.guild_id, None)
+        self.staged_digests.pop(f"guild:{event.guild_id}:sync", None)
         database = self.app.database
         await database.delete((f"guild:{event.guild_id}:sync",))
 
     async def on_update_role(self, event: hikari.RoleEvent) -> None:
-        # TODO: add role.get_guild() to hikari
-        guild = self.app.bot.cache.get_guild(event.guild_id)
-        if guild is not None:
-            await self.sync(
-                guild.id,
-                {
-                    "myself": self.sync_myself(guild),
-                    "roles": self.sync_roles(guild),
-                    "channels": self.sync_channels(guild),
-                },
-            )
+        self.schedule(event.guild_id, "myself", "roles", "channels")
 
     async def on_update_channel(self, event: hikari.GuildChannelEvent) -> None:
-        guild = event.get_guild()
-        if guild is not None:
-            await self.sync(
-                guild.id,
-                {
-                    "channels": self.sync_channels(guild),
-                },
-            )
+        self.schedule(event.guild_id, "channels")
 
     async def on_member_update(self, event: hikari.MemberUpdateEvent) -> None:
         me = self.app.bot.get_me()
         if me is None or event.user_id != me.id:
             return
-        guild = event.get_guild()
-        if guild is not None:
-            await self.sync(
-                guild.id,
-                {
-                    "myself": self.sync_myself(guild),
-                    "roles": self.sync_roles(guild),
-                    "channels": self.sync_channels(guild),
-                },
-            )
+        self.schedule(event.guild_id, "myself", "roles", "channels")
 
     async def on_guild_update(self, event: hikari.GuildUpdateEvent) -> None:
-        await self.sync(
-            event.guild_id,
-            {
-                "guild": self.sync_guild(event.guild),
-            },
-        )
+        self.schedule(event.guild_id, "guild")
+
+    def schedule(self, guild_id: int, *fields: str) -> None:
+        pending = self.pending.get(guild_id, None)
+        if pending is not None:
+            pending.update(fields)
+            return
+
+        self.pending[guild_id] = set(fields)
+        asyncio.create_task(protected_call(self.delayed_sync(guild_id)))
+
+    async def delayed_sync(self, guild_id: int) -> None:
+        await asyncio.sleep(SYNC_DELAY)
+        fields = self.pending.pop(guild_id, None)
+        # TODO: add role.get_guild() to hikari
+        guild = self.app.bot.cache.get_guild(guild_id)
+        if not fields or guild is None:
+            return
+
+        sync_funcs = {
+            "guild": self.sync_guild,
+            "myself": self.sync_myself,
+            "roles": self.sync_roles,
+            "channels": self.sync_channels,
+        }
+        await self.sync(guild_id, {field: sync_funcs[field](guild) for field in fields})
 
     def sync_guild(self, guild: hikari.GatewayGuild) -> dict[str, typing.Any]:
         return {"owner_id": guild.owner_id}
@@ -160,8 +215,22 @@ class SyncExtension:
         ]
 
     async def sync(self, guild_id: int, data: dict[str, typing.Any]) -> None:
+        digests = self.digests.get(guild_id, None)
+        if digests is None:
+            digests = self.digests[guild_id] = {}
+
+        changed: dict[str | bytes, str | bytes | int | float] = {}
+        changed_digests = {}
+        for key, value in data.items():
+            packed = msgpack.packb(value)
+            digest = hashlib.blake2b(packed, digest_size=16).digest()
+            if digests.get(key, None) != digest:
+                changed[key] = packed
+                changed_digests[key] = digest
+
+        if not changed:
+            return
+
         database = self.app.database
-        await database.hset(
-            f"guild:{guild_id}:sync",
-            {key: msgpack.packb(value) for key, value in data.items()},
-        )
+        await database.hset(f"guild:{guild_id}:sync", changed)
+        digests.update(changed_digests)
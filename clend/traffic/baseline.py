@@ -0,0 +1,84 @@
+"""
+Traffic baselines per guild size class.
+
+The histograms of each size class are turned into cumulative counts, which
+answers "how unusual is this value" with a bisect instead of a scan over the
+recent messages.
+"""
+
+from __future__ import annotations
+
+import bisect
+import typing
+
+from .store import BUCKETS, HistogramStore, bucket_bounds, bucket_index
+
+# upper member count of each size class, the last class has no limit
+SIZE_CLASSES = (100, 1_000, 10_000, 100_000)
+MIN_SAMPLES = 10_000  # below this a baseline is not trusted
+
+
+def size_class(member_count: int) -> int:
+    return bisect.bisect_right(SIZE_CLASSES, member_count)
+
+
+class CDF(typing.NamedTuple):
+    # at_least[i] is the number of values in bucket i or above
+    at_least: list[int]
+    total: int
+
+    def share_at_least(self, value: int) -> float:
+        if not self.total:
+            return 1.0
+        return self.at_least[bucket_index(value)] / self.total
+
+    def quantile(self, q: float) -> int:
+        """Smallest value with at most `1 - q` of the values at or above it."""
+        limit = self.total * (1 - q)
+        for index in range(BUCKETS):
+            if self.at_least[index] <= limit:
+                return bucket_bounds(index)[0]
+        return bucket_bounds(BUCKETS - 1)[1]
+
+
+class Baselines:
+    cdfs: list[dict[str, CDF]]
+
+    def __init__(self, stores: typing.Sequence[HistogramStore]) -> None:
+        self.stores = stores
+        self.cdfs = [{} for _ in stores]
+
+    def refresh(self) -> None:
+        cdfs = []
+        for store in self.stores:
+            features = {}
+            for name in store.features:
+                at_least = store.histogram(name)
+                for index in range(BUCKETS - 2, -1, -1):
+                    at_least[index] += at_least[index + 1]
+                features[name] = CDF(at_least, at_least[0])
+            cdfs.append(features)
+        # replaced as a whole, readers on other threads see either version
+        self.cdfs = cdfs
+
+    def get(self, member_count: int, feature: str) -> CDF | None:
+        cdf = self.cdfs[size_class(member_count)].get(feature, None)
+        if cdf is None or cdf.total < MIN_SAMPLES:
+            return None
+        return cdf
+
+    def is_outlier(
+        self, member_count: int, feature: str, value: int, top: float = 0.001
+    ) -> bool | None:
+        """
+        Whether the value is within the `top` share of the feature in guilds of
+        this size, None if there is not enough data to tell.
+        """
+        cdf = self.get(member_count, feature)
+        if cdf is None:
+            return None
+        return cdf.share_at_least(value) <= top
+
+    def quantile(self, member_count: int, feature: str, q: float) -> int | None:
+        cdf = self.get(member_count, feature)
+        return None if cdf is None else cdf.quantile(q)
@@ -1,58 +1,127 @@
+import asyncio
 import logging
+import os
+import random
 import typing
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 
 import hikari
 
 from ..app import TheCleanerApp
-from ..shared.custom_events import SlowTimerEvent
-from .scoring import raw_score_message
+from ..shared.custom_events import FastTimerEvent, SlowTimerEvent
+from .baseline import SIZE_CLASSES, Baselines, size_class
+from .scoring import raw_score_message, scoring
+from .store import HistogramStore
 
 logger = logging.getLogger(__name__)
-path = Path("../traffic.txt")
+path = Path("../traffic.bin")
+legacy_path = Path("../traffic.txt")
+class_paths = [Path(f"../traffic-{i}.bin") for i in range(len(SIZE_CLASSES) + 1)]
+# share of messages that are scored, the histograms only need a sample
+SAMPLE_RATE = float(os.getenv("traffic/sample-rate", "1"))
+BATCH_SIZE = 256  # messages scored per executor call
 
 
 class TrafficExtension:
     listeners: list[tuple[typing.Type[hikari.Event], typing.Any]]
-    data: dict[str, dict[int, int]]
+    pending: list[tuple[hikari.Message, int | None]]
 
     def __init__(self, app: TheCleanerApp) -> None:
         self.app = app
         self.listeners = [
             (hikari.GuildMessageCreateEvent, self.on_message_create),
+            (FastTimerEvent, self.on_fast_timer),
             (SlowTimerEvent, self.on_slow_timer),
         ]
-        self.data = {}
+        features = [func.__name__ for func in scoring]
+        self.store = HistogramStore(features)
+        # all-time histograms per guild size class, for the baselines
+        self.class_stores = [HistogramStore(features, hours=0) for _ in class_paths]
+        self.baselines = Baselines(self.class_stores)
+        self.sample_rate = SAMPLE_RATE
+        self.pending = []
+        # scoring and flushing run here, one at a time and off the event loop
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix="traffic")
 
     def on_load(self) -> None:
-        if not path.exists():
-            return
-        self.data = {
-            line.split(" ")[0]: {
-                int(x.split("=")[0]): int(x.split("=")[1])
-                for x in line.split(" ")[1].split(",")
-            }
-            for line in path.read_text().splitlines()
-        }
+        if not self.store.load(path) and legacy_path.exists():
+            self.import_legacy()
+        for store, class_path in zip(self.class_stores, class_paths):
+            store.load(class_path)
+        self.baselines.refresh()
+
+    def import_legacy(self) -> None:
+        logger.info(f"importing {legacy_path}")
+        for line in legacy_path.read_text().splitlines():
+            name, values = line.split(" ")
+            if name not in self.store.index:
+                continue
+            for item in values.split(","):
+                value, count = item.split("=")
+                self.store.add(name, int(value), int(count))
+        self.store.flush(path)
+        legacy_path.rename(legacy_path.with_suffix(".txt.imported"))
 
     def on_unload(self) -> None:
-        path.write_text(
-            "\n".join(
-                f"{key} " + ",".join(f"{k}={v}" for k, v in value.items())
-                for key, value in self.data.items()
-            )
-        )
+        self.submit_pending()
+        self.executor.shutdown(wait=True)
+        self.flush()
+        self.store.close()
+        for store in self.class_stores:
+            store.close()
+
+    async def on_fast_timer(self, event: FastTimerEvent) -> None:
+        self.submit_pending()
 
     async def on_slow_timer(self, event: SlowTimerEvent) -> None:
-        self.on_unload()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self.flush)
+        await loop.run_in_executor(self.executor, self.baselines.refresh)
+
+    def flush(self) -> None:
+        self.store.flush(path)
+        for store, class_path in zip(self.class_stores, class_paths):
+            store.flush(class_path)
 
     async def on_message_create(self, event: hikari.GuildMessageCreateEvent) -> None:
         if event.is_bot or event.is_webhook or event.member is None:
             return
-        scores = raw_score_message(event.message)
-        # logger.debug(f"scores: {scores}")
-        for name, score in scores.items():
-            values = self.data.get(name)
-            if values is None:
-                values = self.data[name] = {}
-            values[score] = values.get(score, 0) + 1
+        elif self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return
+        guild = event.get_guild()
+        member_count = None if guild is None else guild.member_count
+        self.pending.append((event.message, member_count))
+        if len(self.pending) >= BATCH_SIZE:
+            self.submit_pending()
+
+    def submit_pending(self) -> None:
+        if self.pending:
+            future = self.executor.submit(self.score_messages, self.pending)
+            future.add_done_callback(self.scored)
+            self.pending = []
+
+    def scored(self, future: Future[None]) -> None:
+        # nothing awaits the batches, errors would be lost otherwise
+        if not future.cancelled() and future.exception() is not None:
+            logger.exception("unable to score messages", exc_info=future.exception())
+
+    def score_messages(self, messages: list[tuple[hikari.Message, int | None]]) -> None:
+        for message, member_count in messages:
+            scores = raw_score_message(message)
+            # logger.debug(f"scores: {scores}")
+            self.store.record(scores)
+            if member_count is not None:
+                self.class_stores[size_class(member_count)].record(scores)
+
+    def is_outlier(
+        self, guild: hikari.GatewayGuild, feature: str, value: int, top: float = 0.001
+    ) -> bool | None:
+        """
+        Whether `value` is in the top share of the traffic feature for guilds of
+        this size, None until there is enough traffic to tell or while the
+        member count is unknown.
+        """
+        if guild.member_count is None:
+            return None
+        return self.baselines.is_outlier(guild.member_count, feature, value, top)
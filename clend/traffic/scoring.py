@@ -1,8 +1,8 @@
 import hikari
-from cleaner_data.normalize import normalize
-from cleaner_data.url import get_urls
 from hikari.internal.time import utc_datetime
 
+from ..shared.features import normalized, urls
+
 
 def user_mentions(message: hikari.Message) -> int:
     return len(message.user_mentions_ids) if message.user_mentions_ids else 0
@@ -29,11 +29,11 @@ def message_length(message: hikari.Message) -> int:
 
 
 def normalized_message_length(message: hikari.Message) -> int:
-    return len(normalize(message.content)) if message.content else 0
+    return len(normalized(message.content)) if message.content else 0
 
 
 def normalized_words(message: hikari.Message) -> int:
-    return len(normalize(message.content).split()) if message.content else 0
+    return len(normalized(message.content).split()) if message.content else 0
 
 
 def message_lines(message: hikari.Message) -> int:
@@ -43,7 +43,7 @@ def message_lines(message: hikari.Message) -> int:
 def message_links(message: hikari.Message) -> int:
     if message.content is None:
         return 0
-    return sum(1 for _ in get_urls(message.content))
+    return len(urls(message.content))
 
 
 def author_age_days(message: hikari.Message) -> int:
@@ -0,0 +1,185 @@
+"""
+Binary store for the traffic score histograms.
+
+Every feature has a fixed array of buckets: exact for values below 64, then 8
+buckets per doubling. Next to the all-time histograms there is a ring of
+hourly histograms for the last week, so baselines can be compared per hour.
+
+The file is mapped copy-on-write and updated in place in memory. `flush`
+writes a snapshot next to it and renames it over the old file, so the file on
+disk is always complete.
+"""
+
+from __future__ import annotations
+
+import logging
+import mmap
+import os
+import struct
+import time
+import typing
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+MAGIC = b"CLTH"
+VERSION = 1
+HEADER = struct.Struct("<4sHHHH")
+HEADER_SIZE = 64
+NAME_SIZE = 32
+LINEAR = 64  # values below this get their own bucket
+SUB_BUCKETS = 8
+OCTAVES = 24
+BUCKETS = LINEAR + SUB_BUCKETS * OCTAVES
+HOURS = 24 * 7
+
+
+def bucket_index(value: int) -> int:
+    if value < LINEAR:
+        return max(value, 0)
+    octave = value.bit_length() - LINEAR.bit_length()
+    sub = (value >> (octave + LINEAR.bit_length() - 4)) & (SUB_BUCKETS - 1)
+    return min(LINEAR + octave * SUB_BUCKETS + sub, BUCKETS - 1)
+
+
+def bucket_bounds(index: int) -> tuple[int, int]:
+    """Smallest value of the bucket and the smallest value of the next."""
+    if index < LINEAR:
+        return index, index + 1
+    octave, sub = divmod(index - LINEAR, SUB_BUCKETS)
+    width = 1 << (octave + LINEAR.bit_length() - 4)
+    low = (LINEAR << octave) + sub * width
+    return low, low + width
+
+
+class HistogramStore:
+    features: tuple[str, ...]
+
+    def __init__(self, features: typing.Sequence[str], hours: int = HOURS) -> None:
+        self.features = tuple(features)
+        self.index = {name: i for i, name in enumerate(self.features)}
+        self.hour_slots = hours
+        self.size = self.counts_offset + (1 + hours) * self.slot_size * 8
+        self.map = mmap.mmap(-1, self.size)
+        self.write_header()
+        self.bind()
+
+    @property
+    def hours_offset(self) -> int:
+        return HEADER_SIZE + len(self.features) * NAME_SIZE
+
+    @property
+    def counts_offset(self) -> int:
+        return self.hours_offset + self.hour_slots * 8
+
+    @property
+    def slot_size(self) -> int:
+        """Counters in one set of histograms."""
+        return len(self.features) * BUCKETS
+
+    def bind(self) -> None:
+        view = memoryview(self.map)
+        self.hours = view[self.hours_offset : self.counts_offset].cast("q")
+        self.counts = view[self.counts_offset :].cast("Q")
+
+    def write_header(self) -> None:
+        header = HEADER.pack(
+            MAGIC, VERSION, len(self.features), BUCKETS, self.hour_slots
+        )
+        self.map[: len(header)] = header
+        for i, name in enumerate(self.features):
+            offset = HEADER_SIZE + i * NAME_SIZE
+            self.map[offset : offset + NAME_SIZE] = name.encode().ljust(
+                NAME_SIZE, b"\0"
+            )
+
+    def read_features(self, data: bytes) -> tuple[str, ...] | None:
+        magic, version, features, buckets, hours = HEADER.unpack_from(data)
+        expected = (MAGIC, VERSION, BUCKETS, self.hour_slots)
+        if (magic, version, buckets, hours) != expected:
+            return None
+        names = data[HEADER_SIZE : HEADER_SIZE + features * NAME_SIZE]
+        return tuple(
+            names[offset : offset + NAME_SIZE].rstrip(b"\0").decode()
+            for offset in range(0, len(names), NAME_SIZE)
+        )
+
+    def load(self, path: Path) -> bool:
+        """Map the histograms in `path`, False if there is no usable file."""
+        if not path.exists():
+            return False
+        with path.open("rb") as fp:
+            if os.fstat(fp.fileno()).st_size != self.size:
+                logger.warning(f"{path} has a different layout, starting over")
+                return False
+            mapped = mmap.mmap(fp.fileno(), self.size, access=mmap.ACCESS_COPY)
+        if self.read_features(mapped[: self.hours_offset]) != self.features:
+            logger.warning(f"{path} has different features, starting over")
+            mapped.close()
+            return False
+
+        self.hours.release()
+        self.counts.release()
+        self.map.close()
+        self.map = mapped
+        self.bind()
+        return True
+
+    def slot(self, hour: int) -> int | None:
+        """Offset of the histograms of the hour, claiming the slot if needed."""
+        if not self.hour_slots:
+            return None
+        ring = hour % self.hour_slots
+        offset = (1 + ring) * self.slot_size
+        if self.hours[ring] != hour:
+            self.hours[ring] = hour
+            start = self.counts_offset + offset * 8
+            self.map[start : start + self.slot_size * 8] = bytes(self.slot_size * 8)
+        return offset
+
+    def record(self, scores: dict[str, int], now: float | None = None) -> None:
+        hourly = self.slot(int((time.time() if now is None else now) // 3600))
+        counts = self.counts
+        for name, value in scores.items():
+            offset = self.index[name] * BUCKETS + bucket_index(value)
+            counts[offset] += 1
+            if hourly is not None:
+                counts[hourly + offset] += 1
+
+    def add(self, name: str, value: int, count: int) -> None:
+        """Add to the all-time histogram only, used for imports."""
+        self.counts[self.index[name] * BUCKETS + bucket_index(value)] += count
+
+    def histogram(self, name: str, hour: int | None = None) -> list[int]:
+        """All-time histogram, or the one of a single hour since the epoch."""
+        if hour is None:
+            offset = 0
+        elif self.hour_slots and self.hours[hour % self.hour_slots] == hour:
+            offset = (1 + hour % self.hour_slots) * self.slot_size
+        else:
+            return [0] * BUCKETS
+        start = offset + self.index[name] * BUCKETS
+        return self.counts[start : start + BUCKETS].tolist()
+
+    def window(self, name: str, hours: int, now: float | None = None) -> list[int]:
+        """Histogram of the last `hours` hours."""
+        current = int((time.time() if now is None else now) // 3600)
+        total = [0] * BUCKETS
+        for hour in range(current - min(hours, self.hour_slots) + 1, current + 1):
+            for index, count in enumerate(self.histogram(name, hour)):
+                total[index] += count
+        return total
+
+    def flush(self, path: Path) -> None:
+        """Atomically replace `path` with the current histograms."""
+        data = self.map[:]  # a single copy, so the snapshot is consistent
+        partial = path.with_suffix(".partial")
+        with partial.open("wb") as fp:
+            fp.write(data)
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(partial, path)
+
+    def close(self) -> None:
+        self.hours.release()
+        self.counts.release()
+        self.map.close()
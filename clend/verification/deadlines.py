@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from ..shared.pipeline import Command
+from ..shared.wheel import TimingWheel
+
+KICK_AFTER = 8 * 60  # members without a role are kicked after this
+VERIFY_TIMEOUT = 10 * 60  # verification links stop working after this
+# (guild id, user id, whether this is the kick timer)
+Timer = tuple[int, int, bool]
+
+
+def verification_key(guild_id: int) -> str:
+    return f"guild:{guild_id}:verification"
+
+
+class Deadlines:
+    """
+    Verification deadlines of the members that joined recently.
+
+    Timers live in a timing wheel, changes are persisted in batches as a
+    sorted set per guild, scored by the verification deadline.
+    """
+
+    wheel: TimingWheel[Timer]
+    pending: dict[tuple[int, int], float]
+    added: dict[int, dict[str, float]]
+    removed: dict[int, set[str]]
+    # changes of the last `commands` call, until they are written
+    unwritten: tuple[dict[int, dict[str, float]], dict[int, set[str]]]
+
+    def __init__(self, now: float) -> None:
+        self.wheel = TimingWheel(now)
+        self.pending = {}
+        self.added = {}
+        self.removed = {}
+        self.unwritten = ({}, {})
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def join(self, guild_id: int, user_id: int, now: float) -> None:
+        deadline = now + VERIFY_TIMEOUT
+        self.pending[(guild_id, user_id)] = deadline
+        self.wheel.schedule((guild_id, user_id, True), now + KICK_AFTER)
+        self.wheel.schedule((guild_id, user_id, False), deadline)
+        self.added.setdefault(guild_id, {})[str(user_id)] = deadline
+        if guild_id in self.removed:
+            self.removed[guild_id].discard(str(user_id))
+
+    def leave(self, guild_id: int, user_id: int) -> None:
+        """Verified or gone, removed from redis as well."""
+        self.pending.pop((guild_id, user_id), None)
+        self.wheel.cancel((guild_id, user_id, True))
+        self.wheel.cancel((guild_id, user_id, False))
+        if guild_id in self.added:
+            self.added[guild_id].pop(str(user_id), None)
+        self.removed.setdefault(guild_id, set()).add(str(user_id))
+
+    def deadline(self, guild_id: int, user_id: int) -> float | None:
+        return self.pending.get((guild_id, user_id), None)
+
+    def advance(self, now: float) -> dict[int, list[int]]:
+        """Members due for a kick by now, by guild."""
+        kicks: dict[int, list[int]] = {}
+        for guild_id, user_id, kick in self.wheel.advance(now):
+            if kick:
+                kicks.setdefault(guild_id, []).append(user_id)
+            else:
+                # redis drops them on the next join or when the key expires
+                self.pending.pop((guild_id, user_id), None)
+        return kicks
+
+    def commands(self, now: float) -> list[Command]:
+        """Redis commands for the changes since the last call."""
+        commands: list[Command] = []
+        for guild_id, members in self.added.items():
+            if members:
+                key = verification_key(guild_id)
+                commands.append(("zadd", (key, members)))
+                commands.append(("zremrangebyscore", (key, 0, now)))
+                commands.append(("expire", (key, VERIFY_TIMEOUT)))
+        for guild_id, user_ids in self.removed.items():
+            if user_ids:
+                commands.append(("zrem", (verification_key(guild_id), tuple(user_ids))))
+        self.unwritten = (self.added, self.removed)
+        self.added, self.removed = {}, {}
+        return commands
+
+    def restore(self) -> None:
+        """
+        Take back the changes of the last `commands` call after writing them
+        failed. Changes made since then are newer and win.
+        """
+        added, removed = self.unwritten
+        self.unwritten = ({}, {})
+        for guild_id, members in added.items():
+            current = self.added.setdefault(guild_id, {})
+            gone = self.removed.get(guild_id, set())
+            for user_id, deadline in members.items():
+                if user_id not in gone:
+                    current.setdefault(user_id, deadline)
+        for guild_id, user_ids in removed.items():
+            joined = self.added.get(guild_id, {})
+            self.removed.setdefault(guild_id, set()).update(
+                user_id for user_id in user_ids if user_id not in joined
+            )
@@ -1,5 +1,6 @@
 import asyncio
 import logging
+import time
 import typing
 from datetime import datetime
 
@@ -8,19 +9,24 @@ import msgpack  # type: ignore
 from cleaner_i18n import Message
 
 from ..app import TheCleanerApp
+from ..shared.custom_events import VerificationDueEvent
 from ..shared.dangerous import DANGEROUS_PERMISSIONS
 from ..shared.event import ILog
+from ..shared.pipeline import BatchWriter
 from ..shared.protect import protect, protected_call
 from ..shared.sub import Message as PubMessage
 from ..shared.sub import listen as pubsub_listen
+from .deadlines import Deadlines, verification_key
 
 logger = logging.getLogger(__name__)
+FLUSH_INTERVAL = 1  # seconds between kick checks and redis writes
 
 
 class VerificationExtension:
     listeners: list[tuple[typing.Type[hikari.Event], typing.Any]]
     kicks: dict[int, dict[int, float]]
     task: asyncio.Task[None] | None = None
+    deadline_task: asyncio.Task[None] | None = None
 
     def __init__(self, app: TheCleanerApp) -> None:
         self.app = app
@@ -28,23 +34,44 @@ class VerificationExtension:
             (hikari.MemberCreateEvent, self.on_member_create),
             (hikari.MemberDeleteEvent, self.on_member_delete),
         ]
+        self.deadlines = Deadlines(time.time())
+        self.writer = BatchWriter(app.database)
 
     def on_load(self) -> None:
         self.task = asyncio.create_task(protect(self.verifyd))
+        self.deadline_task = asyncio.create_task(protect(self.deadlined))
 
     def on_unload(self) -> None:
         if self.task is not None:
             self.task.cancel()
+        if self.deadline_task is not None:
+            self.deadline_task.cancel()
 
     async def on_member_create(self, event: hikari.MemberCreateEvent) -> None:
-        await self.app.database.set(
-            f"guild:{event.guild_id}:user:{event.user_id}:verification", "1", ex=600
-        )
+        data = self.app.store.get_data(event.guild_id)
+        if data is not None and not data.config.verification_enabled:
+            return
+        self.deadlines.join(event.guild_id, event.user_id, time.time())
 
     async def on_member_delete(self, event: hikari.MemberDeleteEvent) -> None:
-        await self.app.database.delete(
-            (f"guild:{event.guild_id}:user:{event.user_id}:verification",)
-        )
+        self.deadlines.leave(event.guild_id, event.user_id)
+
+    async def deadlined(self) -> None:
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            now = time.time()
+            for guild_id, user_ids in self.deadlines.advance(now).items():
+                self.app.bot.dispatch(
+                    VerificationDueEvent(self.app.bot, guild_id, tuple(user_ids))
+                )
+            commands = self.deadlines.commands(now)
+            if commands:
+                try:
+                    await self.writer.write(commands)
+                except Exception:
+                    # written again with the next batch
+                    self.deadlines.restore()
+                    raise
 
     async def verifyd(self) -> None:
         pubsub = self.app.database.pubsub()
@@ -73,14 +100,16 @@ class VerificationExtension:
 
         if not config.verification_enabled:
             return
-        elif not await self.app.database.exists(
-            (f"guild:{guild_id}:user:{user_id}:verification",)
-        ):
+
+        deadline = self.deadlines.deadline(guild.id, int(user_id))
+        if deadline is None:  # joined before a restart
+            deadline = await self.app.database.zscore(
+                verification_key(guild.id), str(user_id)
+            )
+        if deadline is None or deadline < time.time():
             return
 
-        await self.app.database.delete(
-            (f"guild:{guild_id}:user:{user_id}:verification",)
-        )
+        self.deadlines.leave(guild.id, int(user_id))
 
         role = guild.get_role(int(config.verification_role))
         if (
@@ -65,4 +65,5 @@ fh.setFormatter(
 logging.getLogger().addHandler(fh)
 
 
-app.bot.run(asyncio_debug=True)
+# asyncio debug mode is expensive, clend.core.dev reports stalls of the loop
+app.bot.run(asyncio_debug=bool(os.getenv("debug/asyncio")))
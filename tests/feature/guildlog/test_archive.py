@@ -0,0 +1,35 @@
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from clend.guildlog import archive
+
+
+def write_log(path: Path, count: int) -> list[tuple[datetime, str]]:
+    random.seed(0)
+    logs = []
+    now = datetime(2022, 9, 1)
+    for index in range(count):
+        now += timedelta(seconds=random.randint(0, 120))
+        text = f"[{now:%Y-%m-%d %H:%M:%S}] Deleted message {index}\n"
+        if random.random() < 0.3:
+            text += f">> spam {'x' * random.randint(0, 200)}\n> Channel: {index}\n"
+        logs.append((now, text))
+    path.write_text("".join(text for _, text in logs))
+    return logs
+
+
+def test_archive_range(tmp_path: Path) -> None:
+    logs = write_log(tmp_path / "2022-09.log", 5000)
+    sealed = archive.seal(tmp_path / "2022-09.log")
+    assert sealed.name == "2022-09.archive"
+    assert (tmp_path / "2022-09.log").exists()
+
+    with sealed.open("rb") as fp:
+        assert len(archive.read_index(fp)) > 1
+
+    start, end = logs[1000][0], logs[3000][0]
+    expected = [text for created_at, text in logs if start <= created_at < end]
+    assert list(archive.read_logs(tmp_path, start, end)) == expected
+    everything = archive.read_logs(tmp_path, datetime(2022, 8, 1), datetime(2023, 1, 1))
+    assert list(everything) == [text for _, text in logs]
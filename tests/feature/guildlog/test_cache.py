@@ -0,0 +1,38 @@
+import io
+import time
+from unittest import mock
+
+from clend.guildlog.cache import HandleCache
+
+
+def test_cache_scan_resistant() -> None:
+    cache = HandleCache(10)
+    handles = {guild_id: io.StringIO() for guild_id in range(1000)}
+    for guild_id in range(5):
+        cache.add(guild_id, handles[guild_id])
+        assert cache.get(guild_id) is handles[guild_id]
+
+    # guilds that log once don't push out the busy ones
+    for guild_id in range(5, 1000):
+        cache.add(guild_id, handles[guild_id])
+    assert len(cache) == 10
+    assert all(guild_id in cache for guild_id in range(5))
+    assert handles[5].closed and not handles[999].closed
+
+
+def test_cache_expire() -> None:
+    cache = HandleCache(10)
+    handles = [io.StringIO() for _ in range(4)]
+    with mock.patch("time.monotonic", return_value=time.monotonic() - 100):
+        cache.add(0, handles[0])
+        cache.add(1, handles[1])
+        cache.get(1)
+    cache.add(2, handles[2])
+    cache.add(3, handles[3])
+    cache.get(3)
+
+    assert cache.expire(50) == 2
+    assert handles[0].closed and handles[1].closed
+    assert 2 in cache and 3 in cache
+    cache.close_all()
+    assert len(cache) == 0 and handles[3].closed
@@ -0,0 +1,46 @@
+import asyncio
+import typing
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from clend.metrics.ext import MetricsExtension
+from clend.metrics.radar import current_day
+from clend.metrics.store import Row
+
+DAY = 60 * 60 * 24
+
+
+class FailingDatabase:
+    async def set(self, key: str, value: bytes) -> None:
+        raise ConnectionError("redis is down")
+
+
+def test_restarted_maind_keeps_radar(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    app: typing.Any = SimpleNamespace(
+        bot=SimpleNamespace(cache=SimpleNamespace(get_guilds_view=dict)),
+        store=SimpleNamespace(get_user_count=lambda: 0),
+        database=FailingDatabase(),
+    )
+
+    async def run() -> list[typing.Any]:
+        ext = MetricsExtension(app)
+        ext.metrics.store.append(
+            [Row(current_day() * DAY + 5, 1, "delete", "", "ping.broad")] * 3
+        )
+        ext.snapshot = ext.metrics.store.snapshot()
+        radars = []
+        for _ in range(2):  # like protect restarting it after the failure
+            with pytest.raises(ConnectionError):
+                await ext.maind()
+            radars.append(ext.metrics.radar.radar())
+        ext.metrics.close()
+        return radars
+
+    first, second = asyncio.run(run())
+    assert first["rules"]["ping.broad"]["total"] == 3
+    assert second == first
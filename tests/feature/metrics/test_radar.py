@@ -0,0 +1,41 @@
+from pathlib import Path
+
+from clend.metrics.metrics import Metrics
+from clend.metrics.radar import RadarRollup, current_day
+from clend.metrics.store import Row
+
+DAY = 60 * 60 * 24
+
+
+def rows(today: int) -> list[Row]:
+    return [
+        Row((today - age) * DAY + 5, guild, "delete", "", "ping.broad")
+        for age in (0, 3, 45, 100)
+        for guild in (1, 2)
+    ]
+
+
+def test_merge() -> None:
+    today = current_day()
+    direct = RadarRollup(today)
+    merged = RadarRollup(today)
+    history = RadarRollup(today)
+    for index, row in enumerate(rows(today)):
+        direct.add(row)
+        (merged if index % 2 else history).add(row)
+    merged.merge(history)
+    assert merged.radar() == direct.radar()
+    assert merged.radar(2) == direct.radar(2)
+
+
+def test_load_radar_once(tmp_path: Path) -> None:
+    metrics = Metrics(tmp_path)
+    metrics.store.append(rows(current_day()))
+    snapshot = metrics.store.snapshot()
+    assert metrics.load_radar(snapshot) == 8
+    radar = metrics.radar.radar()
+    assert radar["rules"]["ping.broad"]["total"] == 8
+
+    assert metrics.load_radar(snapshot) == 0
+    assert metrics.radar.radar() == radar
+    metrics.close()
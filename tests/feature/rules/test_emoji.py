@@ -0,0 +1,37 @@
+import random
+import re
+
+import emoji  # type: ignore
+
+from clend.shared.emojis import count_emojis
+
+emoji_regex = re.compile(r"(<a?:[^\s:]+:\d+>)|(:[^\s:]+:)")
+
+
+def count_emojis_reference(content: str) -> int:
+    # the original implementation used by emoji_mass
+    return len(emoji_regex.findall(emoji.demojize(content)))
+
+
+def test_emoji_simple() -> None:
+    assert count_emojis("hello world") == 0
+    assert count_emojis("hi 😀 :smile: <:pog:123> <a:dance:456>") == 4
+    assert count_emojis("👩🏻‍❤️‍👨🏿") == 1
+    assert count_emojis("1️⃣ 12 #") == 1
+    assert count_emojis("😀" * 100, 7) == 7
+    assert count_emojis(":" + "😀" * 10 + ":") == 10
+    assert count_emojis("<a:" + "😀" * 9 + ":1>") == 9
+
+
+def test_emoji_reference() -> None:
+    random.seed(0)
+    emojis = list(emoji.EMOJI_DATA)
+    parts: tuple[str, ...] = ("hello", " ", "\n", ":smile:", "<:pog:123>", "1", "#")
+    parts += ("<a:dance:456>", "`", "‍", "️", "é", "日本")
+    parts += (":", ":", "<:", "<a:", ":1>", "x:")
+    for _ in range(5000):
+        content = "".join(
+            random.choice(parts) if random.random() < 0.7 else random.choice(emojis)
+            for _ in range(random.randint(0, 15))
+        )
+        assert count_emojis(content) == count_emojis_reference(content), content
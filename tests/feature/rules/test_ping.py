@@ -0,0 +1,47 @@
+import random
+
+from clend.guild.components.rules.ping import has_unescaped
+from clend.shared.markdown import find_unescaped
+
+
+def has_unescaped_reference(content: str, key: str) -> bool:
+    # the original implementation, quadratic in the number of matches
+    current_position: int | None = None
+    while current_position is None or current_position < len(content):
+        try:
+            current_position = content.index(
+                key, None if current_position is None else current_position + 1
+            )
+        except ValueError:
+            break
+        before, after = content[:current_position], content[current_position:]
+        if before.count("`") % 2 == 0:
+            return True
+        elif after.count("`") == 0:
+            return True
+
+    return False
+
+
+def test_unescaped_simple() -> None:
+    assert has_unescaped("hey @everyone", "@everyone")
+    assert not has_unescaped("hey `@everyone`", "@everyone")
+    assert has_unescaped("hey `@everyone", "@everyone")
+    assert has_unescaped("`a` @everyone `b`", "@everyone")
+    assert not has_unescaped("hey everyone", "@everyone")
+    assert find_unescaped("`@here` @everyone", "@everyone", "@here") == 8
+
+
+def test_unescaped_reference() -> None:
+    random.seed(0)
+    parts = ("`", "``", "@everyone", "@here", "@", "a", " ")
+    for _ in range(5000):
+        content = "".join(random.choices(parts, k=random.randint(0, 20)))
+        for key in ("@everyone", "@here", "`"):
+            assert has_unescaped(content, key) == has_unescaped_reference(
+                content, key
+            ), (content, key)
+        assert (find_unescaped(content, "@everyone", "@here") is not None) == (
+            has_unescaped_reference(content, "@everyone")
+            or has_unescaped_reference(content, "@here")
+        ), content
@@ -0,0 +1,13 @@
+import math
+
+from clend.shared.risk import MAX_BASE, TABLE_DAYS, age_risk, age_risk_fast
+
+
+def test_age_table() -> None:
+    for age in (0, 0.5, 1, 1.5, 17.3, 59.9, 365.25, 5945.5, TABLE_DAYS + 3.5):
+        expected = MAX_BASE if age <= 1 else 3 / math.log10(age) - (age**0.1) / 3
+        if expected < 0:
+            expected = MAX_BASE
+        expected = min(expected, MAX_BASE)
+        assert math.isclose(age_risk_fast(age), expected, abs_tol=1e-3)
+        assert math.isclose(age_risk(age), expected)
@@ -0,0 +1,23 @@
+import pytest
+
+from clend.shared.wheel import TimingWheel
+
+
+def test_wheel() -> None:
+    wheel: TimingWheel[str] = TimingWheel(1000.0, slots=8, levels=3)
+    wheel.schedule("soon", 1003.5)
+    wheel.schedule("later", 1100)
+    wheel.schedule("cancelled", 1050)
+    wheel.schedule("late", 900)  # already due
+    assert wheel.cancel("cancelled")
+    assert wheel.due("later") == 1100
+
+    assert wheel.advance(1001) == ["late"]
+    assert wheel.advance(1003) == []
+    assert wheel.advance(1004) == ["soon"]
+    assert wheel.advance(1099.9) == []
+    assert wheel.advance(2000) == ["later"]
+    assert not wheel
+
+    with pytest.raises(ValueError):
+        wheel.schedule("never", 2000 + wheel.span)
@@ -0,0 +1,20 @@
+from clend.traffic.baseline import MIN_SAMPLES, Baselines, size_class
+from clend.traffic.store import HistogramStore, bucket_bounds, bucket_index
+
+
+def test_baselines() -> None:
+    stores = [HistogramStore(["length"], hours=0) for _ in range(5)]
+    baselines = Baselines(stores)
+    store = stores[size_class(500)]
+    for value in range(MIN_SAMPLES):
+        store.record({"length": value % 100})
+    assert baselines.is_outlier(500, "length", 1000) is None
+
+    baselines.refresh()
+    assert baselines.is_outlier(500, "length", 1000) is True
+    assert baselines.is_outlier(500, "length", 50) is False
+    assert baselines.is_outlier(50_000, "length", 1000) is None
+    assert baselines.quantile(500, "length", 0.5) == 50
+    # the end of the bucket holding the largest value
+    top = bucket_bounds(bucket_index(99))[1]
+    assert baselines.quantile(500, "length", 0.999) == top
@@ -0,0 +1,49 @@
+from pathlib import Path
+
+from clend.traffic.store import (
+    BUCKETS,
+    HOURS,
+    HistogramStore,
+    bucket_bounds,
+    bucket_index,
+)
+
+
+def test_buckets() -> None:
+    previous = -1
+    for value in range(0, 1 << 20, 7):
+        index = bucket_index(value)
+        low, high = bucket_bounds(index)
+        assert low <= value < high
+        assert index >= previous
+        previous = index
+    assert bucket_index(1 << 62) == BUCKETS - 1
+
+
+def test_store_roundtrip(tmp_path: Path) -> None:
+    path = tmp_path / "traffic.bin"
+    store = HistogramStore(["length", "links"])
+    now = 1_700_000_000.0
+    for value in range(100):
+        store.record({"length": value, "links": value % 3}, now)
+    store.record({"length": 5, "links": 0}, now + 3600)
+    store.flush(path)
+    store.close()
+
+    store = HistogramStore(["length", "links"])
+    assert store.load(path)
+    hour = int(now // 3600)
+    assert sum(store.histogram("length")) == 101
+    assert store.histogram("links")[:3] == [35, 33, 33]
+    assert sum(store.histogram("length", hour)) == 100
+    assert sum(store.window("length", 2, now + 3600)) == 101
+    assert sum(store.window("length", 1, now + 3600)) == 1
+
+    # a week later the slot is reused for the new hour
+    store.record({"length": 1, "links": 0}, now + HOURS * 3600)
+    assert sum(store.histogram("length", hour)) == 0
+    assert sum(store.histogram("length", hour + HOURS)) == 1
+    assert sum(store.histogram("length")) == 102
+
+    assert not HistogramStore(["length"]).load(path)
+    store.close()
@@ -0,0 +1,49 @@
+from clend.verification.deadlines import (
+    KICK_AFTER,
+    VERIFY_TIMEOUT,
+    Deadlines,
+    verification_key,
+)
+
+
+def test_deadlines() -> None:
+    now = 1_700_000_000.0
+    deadlines = Deadlines(now)
+    deadlines.join(1, 10, now)
+    deadlines.join(1, 11, now)
+    deadlines.join(2, 20, now)
+    deadlines.leave(1, 11)
+    assert deadlines.deadline(1, 10) == now + VERIFY_TIMEOUT
+    assert deadlines.deadline(1, 11) is None
+
+    commands = deadlines.commands(now)
+    assert ("zadd", (verification_key(1), {"10": now + VERIFY_TIMEOUT})) in commands
+    assert ("zrem", (verification_key(1), ("11",))) in commands
+    assert deadlines.commands(now) == []
+
+    assert deadlines.advance(now + KICK_AFTER) == {1: [10], 2: [20]}
+    assert deadlines.deadline(1, 10) is not None
+    assert deadlines.advance(now + VERIFY_TIMEOUT) == {}
+    assert len(deadlines) == 0
+
+
+def test_restore() -> None:
+    now = 1_700_000_000.0
+    deadlines = Deadlines(now)
+    deadlines.join(1, 10, now)
+    deadlines.join(1, 11, now)
+    deadlines.leave(1, 12)
+    deadlines.commands(now)
+
+    # changed while the write was failing
+    deadlines.leave(1, 11)
+    deadlines.join(1, 12, now + 1)
+    deadlines.restore()
+
+    commands = deadlines.commands(now)
+    key = verification_key(1)
+    assert (
+        "zadd",
+        (key, {"10": now + VERIFY_TIMEOUT, "12": now + 1 + VERIFY_TIMEOUT}),
+    ) in commands
+    assert ("zrem", (key, ("11",))) in commands